@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the personal data helpers
+"""
+import os
+import re
+import time
+import timeit
+from encrypt_password import hash_password, hash_passwords
+from filtered_logger import PII_FIELDS, filter_datum, get_redactor
+
+
+MESSAGE = ("name=egg; email=eggmin@eggsample.com; phone=555-1234; "
+           "ssn=123-45-6789; password=eggcellent; ip=60ed:c396:2ff:244; "
+           "last_login=2019-11-14T06:16:24; user_agent=Mozilla/5.0;")
+LONG_MESSAGE = "".join("field{0}=value{0};".format(i) for i in range(200))
+LONG_MESSAGE += MESSAGE
+NUMBER = 100000
+
+
+def uncached_filter_datum(fields, redaction, message, separator):
+    """
+    Baseline: builds the pattern string on every call
+    """
+    pattern = r'(?P<field>{})=[^{}]*'.format('|'.join(fields), separator)
+    repl = r'\g<field>={}'.format(redaction)
+    return re.sub(pattern, repl, message)
+
+
+def report(label: str, seconds: float, number: int) -> None:
+    """
+    Prints the per-call cost of a benchmark run
+    """
+    print("{:<24} {:>8.3f} us/line".format(label, seconds / number * 1e6))
+
+
+def bench_redaction() -> None:
+    """
+    Compares the per-line redaction cost before and after caching
+    """
+    fields = list(PII_FIELDS)
+    redactor = get_redactor(tuple(fields), "***", ";")
+    report("uncached re.sub", timeit.timeit(
+        lambda: uncached_filter_datum(fields, "***", MESSAGE, ";"),
+        number=NUMBER), NUMBER)
+    report("filter_datum", timeit.timeit(
+        lambda: filter_datum(fields, "***", MESSAGE, ";"),
+        number=NUMBER), NUMBER)
+    report("Redactor.redact", timeit.timeit(
+        lambda: redactor.redact(MESSAGE), number=NUMBER), NUMBER)
+
+
+def bench_backends() -> None:
+    """
+    Compares the regex and token backends on a kilobyte-sized line
+    """
+    number = NUMBER // 100
+    for backend in ("regex", "token"):
+        redactor = get_redactor(PII_FIELDS, "***", ";", backend)
+        report("{} ({} bytes)".format(backend, len(LONG_MESSAGE)),
+               timeit.timeit(lambda: redactor.redact(LONG_MESSAGE),
+                             number=number), number)
+    assert (get_redactor(PII_FIELDS, "***", ";", "regex").redact(LONG_MESSAGE)
+            == get_redactor(PII_FIELDS, "***", ";", "token").redact(
+                LONG_MESSAGE))
+
+
+def bench_batch_hashing(count: int = 64, costs=(4, 8, 10)) -> None:
+    """
+    Compares serial and batched hashing throughput at several costs
+    """
+    passwords = ["password{}".format(i) for i in range(count)]
+    print("{} cores".format(os.cpu_count()))
+    for rounds in costs:
+        start = time.perf_counter()
+        for password in passwords:
+            hash_password(password, rounds)
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        list(hash_passwords(passwords, rounds, chunk_size=4))
+        batched = time.perf_counter() - start
+        print("cost {:>2}: serial {:>8.1f} hashes/s, batched {:>8.1f} "
+              "hashes/s".format(rounds, count / serial, count / batched))
+
+
+if __name__ == "__main__":
+    bench_redaction()
+    bench_backends()
+    bench_batch_hashing()
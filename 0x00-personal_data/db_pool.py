@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Module for pooling database connections
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+
+def check_connection(connection: Any) -> bool:
+    """
+    Health check run on checkout: a connection is healthy if it can
+    execute `SELECT 1`
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def reset_connection(connection: Any) -> bool:
+    """
+    Reset run on release: rolls back whatever transaction the borrower
+    left open, so no locks or stale snapshot outlive the checkout.
+    Returns False if the connection is unusable.
+    """
+    try:
+        connection.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def close_quietly(connection: Any) -> None:
+    """
+    Closes a connection, ignoring errors from already broken ones
+    """
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections
+
+    Connections are created lazily by `connect`, reset on release,
+    health-checked on checkout and reused most-recently-released first.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5,
+                 timeout: float = 30.0,
+                 health_check: Callable[[Any], bool] = check_connection,
+                 reset: Callable[[Any], bool] = reset_connection):
+        """
+        Initialize the pool
+
+        Args:
+            connect (callable): Returns a new connection.
+            size (int): Maximum number of open connections.
+            timeout (float): Seconds to wait for a free connection.
+            health_check (callable): Returns False for a dead connection.
+            reset (callable): Rolls back a released connection; returns
+                False if it must be closed instead.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._health_check = health_check
+        self._reset = reset
+        self._idle = deque()
+        self._in_use = 0
+        self._checked_out = set()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def acquire(self, timeout: float = None) -> Any:
+        """
+        Checks a connection out of the pool
+
+        Raises:
+            TimeoutError: If no connection frees up within the timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self._cond:
+            if self._closed:
+                raise ValueError("Pool is closed")
+            if not self._idle and self._in_use >= self.size:
+                self._waits += 1
+                if not self._cond.wait_for(
+                        lambda: (self._closed or self._idle or
+                                 self._in_use < self.size), timeout):
+                    raise TimeoutError("No connection available in pool")
+                if self._closed:
+                    raise ValueError("Pool is closed")
+            connection = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            waited = time.perf_counter() - start
+            self._checkouts += 1
+            self._wait_time += waited
+            self._max_wait_time = max(self._max_wait_time, waited)
+
+        try:
+            if (connection is not None and
+                    not self._health_check(connection)):
+                close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection = self._connect()
+        except BaseException:
+            if connection is not None:
+                close_quietly(connection)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._checked_out.add(id(connection))
+        return connection
+
+    def release(self, connection: Any) -> None:
+        """
+        Rolls a connection back and returns it to the pool
+
+        Raises:
+            ValueError: If the connection is not checked out of this pool.
+        """
+        self._check_in(connection)
+        healthy = self._reset(connection)
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or not healthy:
+                close_quietly(connection)
+            else:
+                self._idle.append(connection)
+            self._cond.notify()
+
+    def discard(self, connection: Any) -> None:
+        """
+        Closes a checked-out connection instead of returning it
+
+        Raises:
+            ValueError: If the connection is not checked out of this pool.
+        """
+        self._check_in(connection)
+        close_quietly(connection)
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _check_in(self, connection: Any) -> None:
+        """
+        Forgets a checked-out connection, rejecting unknown ones so a
+        double release cannot push the pool past its size
+        """
+        with self._cond:
+            try:
+                self._checked_out.remove(id(connection))
+            except KeyError:
+                raise ValueError("Connection is not checked out of this "
+                                 "pool") from None
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[Any]:
+        """
+        Context manager that checks a connection out and back in
+
+        The connection is discarded if the block raises, including
+        BaseExceptions such as KeyboardInterrupt.
+        """
+        connection = self.acquire(timeout)
+        completed = False
+        try:
+            yield connection
+            completed = True
+        finally:
+            if completed:
+                self.release(connection)
+            else:
+                self.discard(connection)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Returns a snapshot of the pool usage counters
+        """
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "max_wait_time": self._max_wait_time,
+            }
+
+    def close(self) -> None:
+        """
+        Closes idle connections; checked-out ones close on release
+        """
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                close_quietly(self._idle.pop())
+            self._cond.notify_all()
@@ -2,31 +2,262 @@
 """
 Module for hashing and validating passwords securely.
 """
+import os
+import time
 import bcrypt
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from hashing_service import get_hashing_service
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 
-def hash_password(password: str) -> bytes:
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+ROUNDS = int(os.getenv("PERSONAL_DATA_BCRYPT_ROUNDS", "12"))
+BATCH_CHUNK_SIZE = 64
+
+
+def hash_password(password: str, rounds: int = None,
+                  use_service: bool = False) -> bytes:
     """
     Hashes a password using bcrypt with a randomly generated salt.
 
     Args:
         password (str): The password to hash.
+        rounds (int): The bcrypt cost factor, defaults to ROUNDS.
+        use_service (bool): Hash in the shared hashing service's worker
+            processes instead of on the caller's thread.
 
     Returns:
         bytes: The salted, hashed password.
+
+    Raises:
+        HashingServiceBusy: If use_service is set and the service is
+            saturated.
     """
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    if use_service:
+        return get_hashing_service().hash_password(password,
+                                                   rounds or ROUNDS)
+    salt = bcrypt.gensalt(rounds or ROUNDS)
+    return bcrypt.hashpw(password.encode(), salt)
 
 
-def is_valid(hashed_password: bytes, password: str) -> bool:
+def is_valid(hashed_password: bytes, password: str,
+             use_service: bool = False) -> bool:
     """
     Validates that the provided password matches the hashed password.
 
     Args:
         hashed_password (bytes): The previously hashed password.
         password (str): The plain text password to verify.
+        use_service (bool): Check in the shared hashing service's worker
+            processes instead of on the caller's thread.
 
     Returns:
         bool: True if the password matches, False otherwise.
+
+    Raises:
+        HashingServiceBusy: If use_service is set and the service is
+            saturated.
     """
+    if use_service:
+        return get_hashing_service().check_password(password,
+                                                    hashed_password)
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+async def hash_password_async(password: str, rounds: int = None) -> bytes:
+    """
+    Awaitable hash_password, run in the shared hashing service.
+    """
+    return await get_hashing_service().hash_password_async(
+        password, rounds or ROUNDS)
+
+
+async def is_valid_async(hashed_password: bytes, password: str) -> bool:
+    """
+    Awaitable is_valid, run in the shared hashing service.
+    """
+    return await get_hashing_service().check_password_async(
+        password, hashed_password)
+
+
+def hash_rounds(hashed_password: bytes) -> int:
+    """
+    Returns the cost factor stored in a bcrypt hash ($2b$<cost>$...).
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+def set_rounds(rounds: int) -> None:
+    """
+    Sets the cost factor used for new hashes.
+
+    Args:
+        rounds (int): The bcrypt cost factor.
+    """
+    global ROUNDS
+    if not MIN_ROUNDS <= rounds <= MAX_ROUNDS:
+        raise ValueError("rounds must be between {} and {}".format(
+            MIN_ROUNDS, MAX_ROUNDS))
+    ROUNDS = rounds
+
+
+def time_hash(rounds: int) -> float:
+    """
+    Returns the seconds one bcrypt hash takes on this host at a cost.
+    """
+    salt = bcrypt.gensalt(rounds)
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration password", salt)
+    return time.perf_counter() - start
+
+
+def calibrate_rounds(target_seconds: float = 0.25,
+                     min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """
+    Measures hashing on this host and returns the highest cost whose
+    hash time stays under the target latency budget.
+
+    Args:
+        target_seconds (float): The latency budget for one hash.
+        min_rounds (int): The lowest cost returned, even if over budget.
+        max_rounds (int): The highest cost tried.
+
+    Returns:
+        int: The calibrated bcrypt cost factor.
+    """
+    rounds = min_rounds
+    elapsed = time_hash(rounds)
+    while rounds < max_rounds and elapsed * 2 <= target_seconds:
+        rounds += 1
+        elapsed = time_hash(rounds)
+    if elapsed > target_seconds and rounds > min_rounds:
+        rounds -= 1
+    return rounds
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Tells whether a hash was made with a cost other than ROUNDS.
+
+    Args:
+        hashed_password (bytes): The previously hashed password.
+
+    Returns:
+        bool: True if the hash should be regenerated.
+    """
+    return hash_rounds(hashed_password) != ROUNDS
+
+
+def verify_and_upgrade(hashed_password: bytes,
+                       password: str) -> Tuple[bool, Optional[bytes]]:
+    """
+    Validates a password and rehashes it if the stored cost is stale.
+
+    Args:
+        hashed_password (bytes): The previously hashed password.
+        password (str): The plain text password to verify.
+
+    Returns:
+        tuple: (valid, new_hash) where new_hash is None unless the
+        password is valid and the stored hash needs a new cost.
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
+
+
+def _hash_chunk(passwords: List[str], rounds: int) -> List[bytes]:
+    """
+    Worker: hashes one chunk of passwords.
+    """
+    return [hash_password(password, rounds) for password in passwords]
+
+
+def _verify_chunk(pairs: List[Tuple[bytes, str]]) -> List[bool]:
+    """
+    Worker: validates one chunk of (hashed_password, password) pairs.
+    """
+    return [is_valid(hashed, password) for hashed, password in pairs]
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Splits an iterable into lists of at most size items.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def _map_chunks(fn: Callable[[list], list], iterable: Iterable,
+                chunk_size: int, workers: Optional[int],
+                progress: Optional[Callable[[int], None]]) -> Iterator:
+    """
+    Runs fn over chunks of iterable in worker processes and yields the
+    results in input order, keeping at most two chunks per worker in
+    flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    pending = deque()
+    with ProcessPoolExecutor(workers) as executor:
+        chunks = _chunks(iterable, chunk_size)
+        while True:
+            for chunk in islice(chunks, workers * 2 - len(pending)):
+                pending.append(executor.submit(fn, chunk))
+            if not pending:
+                return
+            results = pending.popleft().result()
+            done += len(results)
+            if progress is not None:
+                progress(done)
+            yield from results
+
+
+def hash_passwords(passwords: Iterable[str], rounds: int = None,
+                   chunk_size: int = BATCH_CHUNK_SIZE, workers: int = None,
+                   progress: Callable[[int], None] = None
+                   ) -> Iterator[bytes]:
+    """
+    Hashes many passwords across all cores.
+
+    Args:
+        passwords (iterable): The passwords to hash.
+        rounds (int): The bcrypt cost factor, defaults to ROUNDS.
+        chunk_size (int): Passwords hashed per worker job.
+        workers (int): Worker processes, defaults to the CPU count.
+        progress (callable): Called with the number of passwords done
+            after each chunk.
+
+    Returns:
+        iterator: The hashes, in input order.
+    """
+    return _map_chunks(partial(_hash_chunk, rounds=rounds or ROUNDS),
+                       passwords, chunk_size, workers, progress)
+
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]],
+                chunk_size: int = BATCH_CHUNK_SIZE, workers: int = None,
+                progress: Callable[[int], None] = None) -> Iterator[bool]:
+    """
+    Validates many (hashed_password, password) pairs across all cores.
+
+    Args:
+        pairs (iterable): The (hashed_password, password) pairs.
+        chunk_size (int): Pairs checked per worker job.
+        workers (int): Worker processes, defaults to the CPU count.
+        progress (callable): Called with the number of pairs done
+            after each chunk.
+
+    Returns:
+        iterator: The validation results, in input order.
+    """
+    return _map_chunks(_verify_chunk, pairs, chunk_size, workers, progress)
@@ -3,13 +3,127 @@
 Filtered logger modulie
 """
 import re
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import multiprocessing
+import resource
+import sys
+import threading
+import time
 import mysql.connector
-from typing import List
+from collections import deque
+from db_pool import ConnectionPool
+from functools import lru_cache
+from itertools import islice
+from multiprocessing.util import Finalize
+from logging.handlers import QueueHandler, QueueListener
+from typing import (Iterator, List, Mapping, Optional, Sequence, TextIO,
+                    Tuple, Union)
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+REDACTOR_CACHE_SIZE = 128
+REDACTION_BACKEND = os.getenv("PERSONAL_DATA_REDACTION_BACKEND", "regex")
+LOG_QUEUE_SIZE = 10000
+OVERFLOW_POLICIES = ("block", "drop-oldest", "count-and-drop")
+EXPORT_BATCH_SIZE = 1000
+EXPORT_RANGE_SIZE = 50000
+_db_pool = None
+_db_pool_lock = threading.Lock()
+_logger_lock = threading.Lock()
+_worker_db = None
+_worker_formatter = None
+
+
+class Redactor:
+    """
+    Precompiled redaction engine for one set of fields
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Compile the substitution pattern once
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self.pattern = re.compile(r'(?P<field>{})=[^{}]*'.format(
+            '|'.join(self.fields), separator))
+        self.repl = r'\g<field>={}'.format(redaction)
+
+    def redact(self, message: str) -> str:
+        """
+        Obfuscates the configured fields in a log message.
+        """
+        return self.pattern.sub(self.repl, message)
+
+
+class TokenRedactor:
+    """
+    Single-pass redaction engine that splits the message on the separator
+    instead of retrying every field name at every position
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Index the fields by name and by length
+        """
+        if len(separator) != 1:
+            raise ValueError("separator must be a single character")
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self.keys = frozenset(self.fields)
+        self.lengths = sorted({len(f) for f in self.keys}, reverse=True)
+        self.tails = frozenset(f[-1] for f in self.keys if f)
+
+    def redact(self, message: str) -> str:
+        """
+        Obfuscates the configured fields in a log message.
+        """
+        separator = self.separator
+        redact = self._redact_segment
+        return separator.join([redact(segment)
+                               for segment in message.split(separator)])
+
+    def _redact_segment(self, segment: str) -> str:
+        """
+        Redacts the value after the first '=' preceded by a field name,
+        mirroring where the regex backend would match
+        """
+        keys = self.keys
+        end = segment.find('=')
+        while end >= 0:
+            if segment[end - 1:end] in self.tails or '' in keys:
+                for length in self.lengths:
+                    if length <= end and segment[end - length:end] in keys:
+                        return segment[:end + 1] + self.redaction
+            end = segment.find('=', end + 1)
+        return segment
+
+
+REDACTION_BACKENDS = {
+    "regex": Redactor,
+    "token": TokenRedactor,
+}
+
+
+@lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def get_redactor(fields: Tuple[str, ...], redaction: str,
+                 separator: str, backend: str = "regex"
+                 ) -> Union[Redactor, TokenRedactor]:
+    """
+    Returns the cached redactor for a fields/separator/redaction combination
+    """
+    if backend not in REDACTION_BACKENDS:
+        raise ValueError("Unknown redaction backend: {}".format(backend))
+    return REDACTION_BACKENDS[backend](fields, redaction, separator)
 
 
 def filter_datum(fields: List[str], redaction: str, message: str,
@@ -17,9 +131,7 @@ def filter_datum(fields: List[str], redaction: str, message: str,
     """
     Obfuscates specified fields in a log message.
     """
-    pattern = r'(?P<field>{})=[^{}]*'.format('|'.join(fields), separator)
-    repl = r'\g<field>={}'.format(redaction)
-    return re.sub(pattern, repl, message)
+    return get_redactor(tuple(fields), redaction, separator).redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -30,36 +142,316 @@ class RedactingFormatter(logging.Formatter):
     REDACTION = "***"
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
+    STRUCTURED_ATTR = "data"
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], backend: str = None,
+                 json_lines: bool = False):
         """
-        Initialize formatter with fields to redact
+        Initialize formatter with fields to redact and the redaction
+        backend ("regex" or "token", defaults to REDACTION_BACKEND)
+
+        With json_lines=True, structured records are emitted as one JSON
+        object per line instead of FORMAT.
         """
         super().__init__(self.FORMAT)
         self.fields = fields
+        self.keys = frozenset(fields)
+        self.json_lines = json_lines
+        self.redactor = get_redactor(tuple(fields), self.REDACTION,
+                                     self.SEPARATOR,
+                                     backend or REDACTION_BACKEND)
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Formats the log record, redacting sensitive data
         """
+        data = self.structured_data(record)
+        if data is not None:
+            return self.format_structured(record, self.redact_mapping(data))
         message = super().format(record)
-        return filter_datum(self.fields, self.REDACTION,
-                            message, self.SEPARATOR)
+        return self.redactor.redact(message)
+
+    def structured_data(self, record: logging.LogRecord) -> Optional[Mapping]:
+        """
+        Returns the mapping logged as record.msg or passed through
+        extra={"data": ...}, or None for plain text records
+        """
+        if isinstance(record.msg, Mapping):
+            return record.msg
+        data = getattr(record, self.STRUCTURED_ATTR, None)
+        if isinstance(data, Mapping):
+            return data
+        return None
+
+    def redact_mapping(self, data: Mapping) -> dict:
+        """
+        Returns a copy of data with the values of PII keys redacted
+        """
+        keys = self.keys
+        return {k: self.REDACTION if k in keys else v
+                for k, v in data.items()}
+
+    def format_structured(self, record: logging.LogRecord,
+                          data: dict) -> str:
+        """
+        Serializes an already redacted mapping once, either as
+        `k=v; ` text inside FORMAT or as a JSON line
+
+        A text message logged next to extra={"data": ...} is redacted and
+        kept in front of the fields (or under "message" in JSON).
+        """
+        message = None
+        if not isinstance(record.msg, Mapping):
+            message = self.redactor.redact(record.getMessage())
+        if self.json_lines:
+            line = {"logger": record.name, "level": record.levelname,
+                    "asctime": self.formatTime(record)}
+            if message is not None:
+                line["message"] = message
+            line["data"] = data
+            if record.exc_info:
+                line["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(line, default=str)
+        fields = "; ".join("{}={}".format(k, v)
+                           for k, v in data.items()) + self.SEPARATOR
+        record = copy.copy(record)
+        record.msg = fields if not message else message + " " + fields
+        record.args = None
+        return super().format(record)
+
+    def row_template(self, name: str, fields: Sequence[str]) -> str:
+        """
+        Builds the str.format template of one log line for rows of
+        fields, as format_structured would render them at this moment
+
+        PII columns are redacted in the template itself, so the template
+        only takes the values of the other columns.
+        """
+        record = logging.LogRecord(name, logging.INFO, __file__, 0,
+                                   "\0", None, None)
+        head, _, tail = logging.Formatter.format(self, record).partition(
+            "\0")
+        keys = self.keys
+        body = "; ".join(
+            "{}={}".format(field, self.REDACTION if field in keys else "\0")
+            for field in fields) + self.SEPARATOR
+        text = head + body + tail + "\n"
+        return text.replace("{", "{{").replace("}", "}}").replace("\0", "{}")
+
+    def format_rows(self, name: str, fields: Sequence[str],
+                    rows: Sequence[tuple]) -> str:
+        """
+        Formats and redacts a batch of rows into one block of log lines,
+        without a record or dict per row: the line header and timestamp
+        are rendered once per batch and PII columns are masked by
+        position
+        """
+        template = self.row_template(name, fields).format
+        plain = [i for i, field in enumerate(fields) if field not in self.keys]
+        if len(plain) == len(fields):
+            return "".join([template(*row) for row in rows])
+        if not plain:
+            return template() * len(rows)
+        return "".join([template(*[row[i] for i in plain]) for row in rows])
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler that buffers records and writes each batch of
+    capacity formatted lines with a single write and flush
+
+    A record at flush_level or above flushes the batch right away.
+    """
+
+    def __init__(self, capacity: int, stream: TextIO = None,
+                 flush_level: int = logging.ERROR):
+        """
+        Initialize the handler with its batch size and stream
+        """
+        super().__init__(stream)
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self.buffer = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Formats the record into the current batch
+        """
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if (len(self.buffer) >= self.capacity or
+                record.levelno >= self.flush_level):
+            self.flush()
+
+    def write_batch(self, text: str) -> None:
+        """
+        Writes a block of already formatted lines in one call, after the
+        lines buffered so far
+        """
+        self.acquire()
+        try:
+            self.buffer.append(text)
+            self.flush()
+        finally:
+            self.release()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered lines in one call
+        """
+        self.acquire()
+        try:
+            if self.buffer and self.stream:
+                self.stream.write("".join(self.buffer))
+                self.buffer = []
+            super().flush()
+        finally:
+            self.release()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler over a bounded queue with a configurable overflow policy
+
+    "block" waits for room, "drop-oldest" discards the oldest queued
+    record and "count-and-drop" discards the new record. Discarded
+    records are counted in `dropped`.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "block"):
+        """
+        Initialize the handler with its queue and overflow policy
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Keeps structured messages as mappings so the listener's
+        formatter can still redact them by key
+        """
+        if isinstance(record.msg, Mapping):
+            return copy.copy(record)
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Puts the record on the queue, applying the overflow policy
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == "count-and-drop":
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class BoundedQueueListener(QueueListener):
+    """
+    QueueListener that can be stopped safely on a full, bounded queue
+    """
+
+    def enqueue_sentinel(self) -> None:
+        """
+        Waits for room instead of failing when the queue is full
+        """
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        """
+        Drains the queue and stops the thread; safe to call twice
+        """
+        if self._thread is not None:
+            super().stop()
 
 
-def get_logger() -> logging.Logger:
+def get_logger(asynchronous: bool = False,
+               queue_size: int = LOG_QUEUE_SIZE,
+               overflow: str = "block",
+               batch_size: int = 0) -> logging.Logger:
     """
     Creates and returns a configured logger
+
+    With asynchronous=True, records are handed to a bounded queue and
+    redacted and written by a background QueueListener thread.
+    With batch_size > 0, formatted records are written batch_size at a
+    time by a BatchStreamHandler.
+
+    Calling it again replaces the handlers (and stops the listener) set
+    up by the previous call instead of adding more.
     """
-    logger = logging.getLogger("user_data")
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
-    handler = logging.StreamHandler()
-    handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
-    logger.addHandler(handler)
+    with _logger_lock:
+        logger = logging.getLogger("user_data")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        remove_handlers(logger)
+        logger.addHandler(_make_handler(asynchronous, queue_size, overflow,
+                                        batch_size))
     return logger
 
 
+def _make_handler(asynchronous: bool, queue_size: int, overflow: str,
+                  batch_size: int) -> logging.Handler:
+    """
+    Builds the handler chain configured by get_logger
+    """
+    if batch_size > 0:
+        handler = BatchStreamHandler(batch_size)
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    if asynchronous:
+        queue_handler = BoundedQueueHandler(queue.Queue(queue_size),
+                                            overflow)
+        queue_handler.listener = BoundedQueueListener(queue_handler.queue,
+                                                      handler)
+        queue_handler.listener.start()
+        handler = queue_handler
+    return handler
+
+
+def remove_handlers(logger: logging.Logger) -> None:
+    """
+    Detaches, flushes and closes the handlers of a logger, draining and
+    stopping their queue listeners first
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        listener = getattr(handler, "listener", None)
+        if listener is not None:
+            listener.stop()
+            for target in listener.handlers:
+                target.flush()
+                target.close()
+        handler.flush()
+        handler.close()
+
+
+@atexit.register
+def _close_logger() -> None:
+    """
+    Drains and closes the user_data handlers at interpreter exit
+    """
+    with _logger_lock:
+        remove_handlers(logging.getLogger("user_data"))
+
+
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """
     Returns a connection to the MySQL database
@@ -78,22 +470,216 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return connection
 
 
-def main() -> None:
+def get_db_pool() -> ConnectionPool:
+    """
+    Returns the shared pool of connections created by get_db, sized by
+    PERSONAL_DATA_DB_POOL_SIZE and PERSONAL_DATA_DB_POOL_TIMEOUT
+
+    Usage:
+        with get_db_pool().connection() as db:
+            ...
+    """
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = ConnectionPool(
+                get_db,
+                size=int(os.getenv("PERSONAL_DATA_DB_POOL_SIZE", "5")),
+                timeout=float(os.getenv("PERSONAL_DATA_DB_POOL_TIMEOUT",
+                                        "30")),
+            )
+        return _db_pool
+
+
+def fetch_batches(cursor, batch_size: int) -> Iterator[List[tuple]]:
+    """
+    Yields rows from the cursor batch_size at a time
+    """
+    rows = cursor.fetchmany(batch_size)
+    while rows:
+        yield rows
+        rows = cursor.fetchmany(batch_size)
+
+
+def export_users(batch_size: int = EXPORT_BATCH_SIZE,
+                 output: TextIO = None) -> int:
+    """
+    Streams the users table through an unbuffered cursor and logs each
+    row, keeping memory flat regardless of the table size
+
+    Each fetchmany batch is formatted by RedactingFormatter.format_rows
+    and written to output (default stderr) with one write through a
+    BatchStreamHandler.
+
+    Returns:
+        int: The number of rows exported.
+    """
+    start = time.perf_counter()
+    db = get_db()
+    cursor = db.cursor(buffered=False)
+    cursor.execute("SELECT * FROM users;")
+    fields = [i[0] for i in cursor.description]
+    formatter = RedactingFormatter(list(PII_FIELDS))
+    handler = BatchStreamHandler(batch_size, output or sys.stderr)
+    handler.setFormatter(formatter)
+    count = 0
+    for rows in fetch_batches(cursor, batch_size):
+        handler.write_batch(formatter.format_rows("user_data", fields,
+                                                  rows))
+        count += len(rows)
+    cursor.close()
+    db.close()
+    report_export(count, start)
+    return count
+
+
+def report_export(count: int, start: float) -> None:
+    """
+    Prints rows per second and peak RSS of an export to stderr
+    """
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("Exported {} rows in {:.2f}s ({:.0f} rows/s), peak RSS {} KB"
+          .format(count, elapsed, count / elapsed if elapsed else 0,
+                  peak_kb), file=sys.stderr)
+
+
+def primary_key_range(db) -> Optional[Tuple[str, int, int]]:
+    """
+    Returns (column, min, max) for a single integer primary key on the
+    users table, or None if the table cannot be split by key
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT COLUMN_NAME"
+                   " FROM information_schema.KEY_COLUMN_USAGE"
+                   " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users'"
+                   " AND CONSTRAINT_NAME = 'PRIMARY';")
+    keys = cursor.fetchall()
+    if len(keys) != 1:
+        cursor.close()
+        return None
+    key = keys[0][0]
+    cursor.execute("SELECT MIN(`{0}`), MAX(`{0}`) FROM users;".format(key))
+    low, high = cursor.fetchone()
+    cursor.close()
+    if not isinstance(low, int) or not isinstance(high, int):
+        return None
+    return key, low, high
+
+
+def _init_export_worker() -> None:
+    """
+    Opens the connection and formatter owned by one export process; the
+    connection is closed when the process exits
+    """
+    global _worker_db, _worker_formatter
+    _worker_db = get_db()
+    Finalize(_worker_db, _worker_db.close, exitpriority=10)
+    _worker_formatter = RedactingFormatter(list(PII_FIELDS))
+
+
+def _export_range(task: Tuple[str, int, int, int]) -> Tuple[int, str]:
+    """
+    Formats and redacts the rows whose key is in [low, high), fetching
+    batch_size rows at a time
+
+    Returns:
+        tuple: The row count and the redacted lines.
+    """
+    key, low, high, batch_size = task
+    cursor = _worker_db.cursor(buffered=False)
+    cursor.execute("SELECT * FROM users WHERE `{0}` >= %s AND `{0}` < %s"
+                   " ORDER BY `{0}`;".format(key), (low, high))
+    fields = [i[0] for i in cursor.description]
+    lines = []
+    count = 0
+    for rows in fetch_batches(cursor, batch_size):
+        lines.append(_worker_formatter.format_rows("user_data", fields,
+                                                   rows))
+        count += len(rows)
+    cursor.close()
+    return count, "".join(lines)
+
+
+def export_users_parallel(workers: int, output: TextIO = None,
+                          range_size: int = EXPORT_RANGE_SIZE,
+                          batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Splits the users table into primary-key ranges, redacts each range
+    in a worker process and writes the results to output in key order,
+    keeping at most two ranges per worker in flight
+
+    Falls back, with a warning, to a single-process export_users to the
+    same output when the table has no integer primary key.
+
+    Returns:
+        int: The number of rows exported.
+    """
+    start = time.perf_counter()
+    db = get_db()
+    bounds = primary_key_range(db)
+    db.close()
+    output = output or sys.stderr
+    if bounds is None:
+        print("users has no single integer primary key,"
+              " exporting in one process", file=sys.stderr)
+        return export_users(batch_size, output)
+    key, low, high = bounds
+    span = max(1, min(range_size, (high - low) // workers + 1))
+    tasks = ((key, i, i + span, batch_size)
+             for i in range(low, high + 1, span))
+    count = 0
+    pending = deque()
+    with multiprocessing.Pool(workers, _init_export_worker) as pool:
+        while True:
+            for task in islice(tasks, workers * 2 - len(pending)):
+                pending.append(pool.apply_async(_export_range, (task,)))
+            if not pending:
+                break
+            rows, text = pending.popleft().get()
+            output.write(text)
+            count += rows
+        pool.close()
+        pool.join()
+    output.flush()
+    report_export(count, start)
+    return count
+
+
+def main(streaming: bool = False,
+         batch_size: int = EXPORT_BATCH_SIZE,
+         workers: int = 1, output: TextIO = None) -> None:
     """
     Fetches data from users table and logs each row
     """
+    if workers > 1:
+        export_users_parallel(workers, output, batch_size=batch_size)
+        return
+    if streaming:
+        export_users(batch_size, output)
+        return
     db = get_db()
     cursor = db.cursor()
     cursor.execute("SELECT * FROM users;")
     fields = [i[0] for i in cursor.description]
     logger = get_logger()
     for row in cursor:
-        row_dict = dict(zip(fields, row))
-        message = "; ".join(f"{k}={v}" for k, v in row_dict.items()) + ";"
-        logger.info(message)
+        logger.info(dict(zip(fields, row)))
     cursor.close()
     db.close()
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--stream", action="store_true",
+                        help="stream rows through an unbuffered cursor")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE,
+                        help="rows fetched and flushed per batch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="export primary-key ranges in N processes")
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        help="file for the streaming or parallel export")
+    args = parser.parse_args()
+    main(args.stream, args.batch_size, args.workers, args.output)
@@ -7,7 +7,7 @@ from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
-from api.v1.auth.auth import Auth
+from api.v1.auth.auth import Auth, PathMatcher
 from api.v1.auth.basic_auth import BasicAuth
 
 
@@ -23,6 +23,10 @@ if auth_type == "auth":
 elif auth_type == "basic_auth":
     auth = BasicAuth()
 
+excluded_paths = PathMatcher([
+        '/api/v1/status/', '/api/v1/unauthorized/', '/api/v1/forbidden/'
+])
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -55,9 +59,6 @@ def before_request_func():
     if auth is None:
         return
 
-    excluded_paths = [
-            '/api/v1/status/', '/api/v1/unauthorized/', '/api/v1/forbidden/'
-    ]
     if not auth.require_auth(request.path, excluded_paths):
         return
 
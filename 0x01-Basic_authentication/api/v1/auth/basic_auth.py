@@ -3,15 +3,57 @@
 BasicAuth module
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.credential_cache import CredentialCache
 from models.user import User
+from os import getenv
 from typing import TypeVar, Tuple
+import base64
+import binascii
+
+
+MAX_AUTHORIZATION_HEADER_LENGTH = 4096
+BASIC_PREFIX = "Basic "
+
+try:
+    binascii.a2b_base64(b"", strict_mode=True)
+
+    def _b64decode_strict(data: str) -> bytes:
+        """
+        Decodes Base64, rejecting any character outside the alphabet
+        """
+        return binascii.a2b_base64(data, strict_mode=True)
+except TypeError:
+    def _b64decode_strict(data: str) -> bytes:
+        """
+        Decodes Base64, rejecting any character outside the alphabet
+        (Python < 3.11)
+        """
+        return base64.b64decode(data, validate=True)
 
 
 class BasicAuth(Auth):
     """
     BasicAuth class that inherits from Auth
+
+    Verified Authorization headers are remembered for
+    BASIC_AUTH_CACHE_TTL seconds (default 60, 0 disables), at most
+    BASIC_AUTH_CACHE_SIZE of them (default 1024)
     """
 
+    def __init__(self):
+        """
+        Initialize the verified-credential cache from the environment
+        """
+        try:
+            size = int(getenv('BASIC_AUTH_CACHE_SIZE', '1024'))
+        except ValueError:
+            size = 1024
+        try:
+            ttl = float(getenv('BASIC_AUTH_CACHE_TTL', '60'))
+        except ValueError:
+            ttl = 60.0
+        self.credential_cache = CredentialCache(size, ttl)
+
     def extract_base64_authorization_header(
             self, authorization_header: str) -> str:
         """
@@ -71,6 +113,33 @@ class BasicAuth(Auth):
         email, password = decoded_base64_authorization_header.split(':', 1)
         return email, password
 
+    def parse_authorization_header(
+            self, authorization_header: str) -> Tuple[str, str]:
+        """
+        Fast path for the three extract/decode steps above: one strict
+        Base64 decode and one split on bytes, oversized headers rejected
+        before any work
+
+        Args:
+            authorization_header (str): The raw Authorization header
+
+        Returns:
+            tuple: (email, password) if valid, otherwise (None, None)
+        """
+        if (type(authorization_header) is not str or
+                len(authorization_header) > MAX_AUTHORIZATION_HEADER_LENGTH
+                or not authorization_header.startswith(BASIC_PREFIX)):
+            return None, None
+        try:
+            decoded = _b64decode_strict(
+                authorization_header[len(BASIC_PREFIX):])
+            email, colon, password = decoded.partition(b':')
+            if not colon:
+                return None, None
+            return email.decode('utf-8'), password.decode('utf-8')
+        except (binascii.Error, ValueError):
+            return None, None
+
     def user_object_from_credentials(
             self, user_email: str, user_pwd: str) -> TypeVar('User'):
         """
@@ -110,16 +179,15 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
-        base64_part = self.extract_base64_authorization_header(auth_header)
-        if base64_part is None:
-            return None
+        user = self.credential_cache.get(auth_header)
+        if user is not None:
+            return user
 
-        decoded = self.decode_base64_authorization_header(base64_part)
-        if decoded is None:
-            return None
-
-        email, password = self.extract_user_credentials(decoded)
+        email, password = self.parse_authorization_header(auth_header)
         if email is None or password is None:
             return None
 
-        return self.user_object_from_credentials(email, password)
+        user = self.user_object_from_credentials(email, password)
+        if user is not None:
+            self.credential_cache.put(auth_header, user)
+        return user
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+CredentialCache module: remembers verified Authorization headers
+"""
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, TypeVar
+from models.user import User
+import os
+import threading
+import time
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache, with a TTL, of Authorization headers that were
+    verified, mapping a keyed hash of the header to the user ID
+
+    Each hit reloads the user and compares its email and stored password
+    hash with the ones seen at verification time, so removing a user or
+    changing its email or password invalidates the entries (in any
+    process).
+    """
+
+    def __init__(self, size: int = 1024, ttl: float = 60.0):
+        """
+        Initialize an empty cache
+
+        Args:
+            size (int): Maximum number of headers kept (0 disables)
+            ttl (float): Seconds a verified header is trusted (0 disables)
+        """
+        self.size = size
+        self.ttl = ttl
+        self._key = os.urandom(16)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Tells if the cache keeps anything
+        """
+        return self.size > 0 and self.ttl > 0
+
+    def _digest(self, header: str) -> bytes:
+        """
+        Keyed hash of a raw header, so headers are never kept in memory
+        """
+        return blake2b(header.encode('utf-8', 'surrogatepass'),
+                       key=self._key, digest_size=16).digest()
+
+    def get(self, header: str) -> TypeVar('User'):
+        """
+        Returns the user of a verified header, or None
+        """
+        if not self.enabled:
+            return None
+        digest = self._digest(header)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[3] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+        user_id, email, password, _ = entry
+        user = User.get(user_id)
+        if (user is None or user.email != email or
+                user.password != password):
+            with self._lock:
+                if self._entries.get(digest) is entry:
+                    del self._entries[digest]
+                self.invalidations += 1
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return user
+
+    def put(self, header: str, user: TypeVar('User')) -> None:
+        """
+        Remembers that a header was verified for a user
+        """
+        if not self.enabled:
+            return
+        digest = self._digest(header)
+        entry = (user.id, user.email, user.password,
+                 time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drops every entry
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Returns the size and hit/miss counters of the cache
+        """
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations}
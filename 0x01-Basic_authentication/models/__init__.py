@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+""" Models package
+
+MODELS_STORAGE selects the storage engine: "file" (JSON files, default)
+or "sqlite" (database file at MODELS_SQLITE_PATH)
+"""
+from os import getenv
+
+
+if getenv("MODELS_STORAGE") == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(getenv("MODELS_SQLITE_PATH", ".db.sqlite3"))
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
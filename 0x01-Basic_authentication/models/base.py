@@ -3,38 +3,152 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
+from models import storage
+from models.engine.file_storage import DATA
 import json
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+TIMESTAMP_LENGTH = 19
+JSON_SEPARATORS = (',', ':')
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=JSON_SEPARATORS)
+_JSON_CACHE = "_serialized"
+
+
+def parse_timestamp(text: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+
+    The fixed format is what datetime.fromisoformat reads fastest; any
+    other string goes through strptime, which rejects it as before.
+    """
+    if (len(text) == TIMESTAMP_LENGTH and text[4] + text[7] + text[10] +
+            text[13] + text[16] == '--T::' and text.isascii()):
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    return datetime.strptime(text, TIMESTAMP_FORMAT)
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a datetime with TIMESTAMP_FORMAT
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(timespec='seconds')
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+class _Stamp():
+    """ A timestamp both parsed and serialized
+    """
+
+    __slots__ = ('value', 'text')
+
+    def __init__(self, value: datetime, text: str):
+        """ Initialize a _Stamp
+        """
+        self.value = value
+        self.text = text
+
+
+class Timestamp():
+    """ Datetime attribute that keeps its serialized string
+
+    Objects built from stored records hold the TIMESTAMP_FORMAT string in
+    their __dict__; it is parsed on first access, so to_json of an object
+    whose timestamps were never read does no parsing at all. Once a value
+    is both parsed and formatted, the pair is kept together so neither
+    is done again until the attribute is assigned.
+    """
+
+    def __set_name__(self, owner, name: str):
+        """ Remember the attribute name
+        """
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        """ Return the datetime, parsing the stored string if needed
+        """
+        if obj is None:
+            return self
+        try:
+            value = obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+        if type(value) is _Stamp:
+            return value.value
+        if type(value) is str:
+            stamp = _Stamp(parse_timestamp(value), value)
+            obj.__dict__[self.name] = stamp
+            return stamp.value
+        return value
+
+    def __set__(self, obj, value):
+        """ Store a datetime or a TIMESTAMP_FORMAT string
+        """
+        obj.__dict__[self.name] = value
 
 
 class Base():
     """ Base class
+
+    Objects are kept by the storage engine selected in models (the JSON
+    file engine by default). The class attributes below tune it per model:
+      - INDEXES: attributes with a secondary index used by search()
+      - PERSISTENCE: "snapshot", "journal" or "write_behind" (file engine,
+        see models.engine.file_storage)
+      - LAZY_LOAD: keep loaded records raw until get/search needs them
+        (file engine)
+      - COLUMNAR: keep the serialized fields in a per-class columnar
+        table and build objects from it on get/search (file engine)
+      - CACHE_JSON: keep the to_json/to_json_text results on the object
+        until an attribute is assigned
+      - JOURNAL_FSYNC_EVERY, JOURNAL_COMPACT_EVERY, SNAPSHOT_BACKUPS,
+        WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_DIRTY
     """
 
+    INDEXES = ()
+    PERSISTENCE = "snapshot"
+    JOURNAL_FSYNC_EVERY = 1
+    JOURNAL_COMPACT_EVERY = 1000
+    SNAPSHOT_BACKUPS = 0
+    WRITE_BEHIND_INTERVAL = 1.0
+    WRITE_BEHIND_MAX_DIRTY = 100
+    LAZY_LOAD = False
+    COLUMNAR = False
+    CACHE_JSON = True
+
+    created_at = Timestamp()
+    updated_at = Timestamp()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        if 'id' in kwargs:
+            self.id = kwargs['id']
+        else:
+            self.id = str(uuid.uuid4())
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = kwargs.get('created_at')
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = kwargs.get('updated_at')
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value):
+        """ Set an attribute and drop the cached serialization
+
+        The cache is replaced rather than cleared, after the value is set,
+        so a to_json running concurrently stores its (maybe stale) result
+        in the old cache only.
+        """
+        object.__setattr__(self, name, value)
+        if _JSON_CACHE in self.__dict__:
+            self.__dict__[_JSON_CACHE] = {}
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -47,66 +161,82 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
+        cache = self._json_cache()
+        if cache is not None and for_serialization in cache:
+            return dict(cache[for_serialization])
         result = {}
         for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
+            if key[0] == '_' and (not for_serialization or
+                                  key == _JSON_CACHE):
                 continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+            if type(value) is _Stamp:
+                result[key] = value.text
+            elif type(value) is datetime:
+                result[key] = format_timestamp(value)
+                if isinstance(getattr(type(self), key, None), Timestamp):
+                    self.__dict__[key] = _Stamp(value, result[key])
             else:
                 result[key] = value
+        if cache is not None:
+            cache[for_serialization] = result
+            return dict(result)
         return result
 
+    def _json_cache(self) -> dict:
+        """ Cache of the serialized forms, None if CACHE_JSON is off
+        """
+        cache = self.__dict__.get(_JSON_CACHE)
+        if cache is None and self.CACHE_JSON:
+            cache = self.__dict__[_JSON_CACHE] = {}
+        return cache
+
+    def to_json_text(self, for_serialization: bool = False) -> str:
+        """ Encode to_json as compact JSON with sorted keys (the way
+        jsonify does), so list responses can join cached fragments
+        """
+        cache = self._json_cache()
+        key = ('text', for_serialization)
+        if cache is not None and key in cache:
+            return cache[key]
+        text = _ENCODER.encode(self.to_json(for_serialization))
+        if cache is not None:
+            cache[key] = text
+        return text
+
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        storage.load(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage.save_all(cls)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def compact(cls):
+        """ Fold the journal into the snapshot file
+        """
+        storage.save_all(cls)
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -118,20 +248,16 @@ class Base():
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return storage.search(cls, attributes)
+
+
+def flush():
+    """ Write out everything the storage engine buffers
+    """
+    storage.flush()
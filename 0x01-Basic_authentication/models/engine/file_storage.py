@@ -0,0 +1,786 @@
+#!/usr/bin/env python3
+""" JSON file storage engine module
+
+Objects live in the in-process DATA dict and are persisted to
+.db_<Class>.json according to the PERSISTENCE setting of their class:
+  - "snapshot": rewrite .db_<Class>.json on every write
+  - "journal": append one record per write to .db_<Class>.journal,
+    fsync every JOURNAL_FSYNC_EVERY records (0: never) and, every
+    JOURNAL_COMPACT_EVERY records, move the journal aside to
+    .db_<Class>.journal.old and let a background thread fold it into
+    the snapshot while new records go to a fresh journal
+  - "write_behind": mark the class dirty and let a background thread
+    rewrite the snapshot WRITE_BEHIND_INTERVAL seconds later, or as soon
+    as WRITE_BEHIND_MAX_DIRTY writes are pending; writes not yet flushed
+    are lost on a crash (flush() forces them out)
+
+SNAPSHOT_BACKUPS previous snapshots are kept as .db_<Class>.json.N and
+attributes listed in INDEXES get a secondary hash index used by search.
+
+With LAZY_LOAD set on a class, loading keeps the raw JSON records and an
+object is only built the first time get or search returns it; records
+never touched are written back as they were read.
+
+With COLUMNAR set on a class, objects are not kept at all: their
+serialized fields live in a per-class table of one list per field
+(TABLES), string values of repetitive columns are interned, and DATA
+maps each ID to its row. get and search build objects from their rows;
+an object stays shared by later gets while it is referenced (LIVE), so
+its unsaved changes are only dropped along with the last reference.
+
+Each class has a reader/writer lock over its objects and indexes, a
+lock serializing its file I/O and a lock serializing its snapshot
+writes, taken in the order I/O, snapshot, objects. Readers copy what
+they need under the shared lock and work on the copy.
+"""
+from typing import TypeVar, List, Iterable
+from os import path
+from models.engine.storage import Storage, matches
+from models.rwlock import ReadWriteLock
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+
+
+DATA = {}
+INDEXES = {}
+INDEXED_VALUES = {}
+JOURNALS = {}
+DIRTY = {}
+_dirty_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_dirty_event = threading.Event()
+_writer = None
+LOCKS = {}
+_locks_lock = threading.Lock()
+_MISSING = object()
+TABLES = {}
+LIVE = {}
+_live_lock = threading.Lock()
+INTERN_PROBE = 1024
+SNAPSHOT_CHUNK = 1000
+
+
+class FileStorage(Storage):
+    """ JSON file storage engine
+    """
+
+    def load(self, cls) -> None:
+        """ Load all objects of a class from its snapshot and journal
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        objects = _objects(cls)
+        with _io_lock(s_class), _snapshot_lock(s_class), \
+                _data_lock(s_class).write():
+            objects.clear()
+            _reset_indexes(cls)
+            _reset_table(cls)
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    objs_json = json.load(f)
+                    for obj_id, obj_json in objs_json.items():
+                        _put(cls, obj_id, obj_json)
+            _replay_journal(cls)
+
+    def save_all(self, cls) -> None:
+        """ Save all objects of a class to file
+
+        The snapshot is streamed to a temporary file, fsynced and moved
+        over the old one, so a crash never leaves a truncated store.
+        """
+        s_class = cls.__name__
+        _objects(cls)
+        with _io_lock(s_class), _snapshot_lock(s_class):
+            _write_snapshot(cls, ".db_{}.json".format(s_class))
+            _truncate_journal(s_class)
+
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Store an object and persist the change
+        """
+        cls = obj.__class__
+        objects = _objects(cls)
+        table = TABLES.get(cls.__name__)
+        record = obj.to_json(True) if table is not None else None
+        with _data_lock(cls.__name__).write():
+            if table is None:
+                objects[obj.id] = obj
+                _index(cls, obj.id, obj)
+            else:
+                _put(cls, obj.id, record)
+                with _live_lock:
+                    LIVE[cls.__name__][obj.id] = obj
+        self._persist(cls, 'upsert', obj)
+
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Remove an object and persist the change
+        """
+        cls = obj.__class__
+        objects = _objects(cls)
+        with _data_lock(cls.__name__).write():
+            if not _drop(cls, obj.id):
+                return
+        self._persist(cls, 'delete', obj)
+
+    def count(self, cls) -> int:
+        """ Count all objects of a class
+        """
+        return len(_objects(cls))
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        obj = _objects(cls).get(id)
+        if type(obj) in (dict, int):
+            objs = _hydrate(cls, [id])
+            return objs[0] if objs else None
+        return obj
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        return [obj for obj in _hydrate(cls, _candidates(cls, attributes))
+                if matches(obj, attributes)]
+
+    def flush(self) -> None:
+        """ Write every class with pending write-behind changes now
+        """
+        flush()
+
+    def _persist(self, cls, op: str, obj: TypeVar('Base')):
+        """ Write one 'upsert' or 'delete' according to PERSISTENCE
+        """
+        if cls.PERSISTENCE == "journal":
+            record = {'op': op, 'id': obj.id}
+            if op == 'upsert':
+                record['obj'] = obj.to_json(True)
+            with _io_lock(cls.__name__):
+                _append_journal(self, cls, record)
+        elif cls.PERSISTENCE == "write_behind":
+            _mark_dirty(self, cls)
+        else:
+            self.save_all(cls)
+
+
+def _objects(cls) -> dict:
+    """ Return the object dict of a class, creating it on first use
+    """
+    s_class = cls.__name__
+    objects = DATA.get(s_class)
+    if objects is None:
+        with _data_lock(s_class).write():
+            if DATA.get(s_class) is None:
+                DATA[s_class] = {}
+                _reset_indexes(cls)
+                _reset_table(cls)
+            objects = DATA[s_class]
+    return objects
+
+
+def _locks(s_class: str) -> dict:
+    """ Return the locks of a class, creating them on first use
+    """
+    locks = LOCKS.get(s_class)
+    if locks is None:
+        with _locks_lock:
+            locks = LOCKS.setdefault(s_class, {
+                'data': ReadWriteLock(), 'io': threading.RLock(),
+                'snapshot': threading.RLock()})
+    return locks
+
+
+def _data_lock(s_class: str) -> ReadWriteLock:
+    """ Reader/writer lock over the objects and indexes of a class
+    """
+    return _locks(s_class)['data']
+
+
+def _io_lock(s_class: str) -> threading.RLock:
+    """ Lock serializing snapshot and journal writes of a class
+    """
+    return _locks(s_class)['io']
+
+
+def _snapshot_lock(s_class: str) -> threading.RLock:
+    """ Lock serializing snapshot writes of a class, so a background
+    compaction never replaces a newer snapshot with an older one
+    """
+    return _locks(s_class)['snapshot']
+
+
+def _reset_indexes(cls):
+    """ Create empty indexes for the declared attributes
+    """
+    s_class = cls.__name__
+    INDEXES[s_class] = {attr: {} for attr in cls.INDEXES}
+    INDEXED_VALUES[s_class] = {}
+
+
+class _Table():
+    """ Columnar store of the serialized records of one class
+
+    Each field is a list indexed by row; rows freed by a delete are
+    reused. The ID is not stored (it is the key of the row in DATA).
+    String values are interned per column while the column proves
+    repetitive: a column whose first INTERN_PROBE strings are more than
+    half distinct stops interning.
+    """
+
+    def __init__(self):
+        """ Initialize an empty table
+        """
+        self.fields = {}
+        self.columns = []
+        self.pools = []
+        self.probes = []
+        self.free = []
+        self.size = 0
+
+    def _column(self, field: str) -> list:
+        """ Return the column of a field, adding it on first use
+        """
+        i = self.fields.get(field)
+        if i is None:
+            i = self.fields[field] = len(self.columns)
+            self.columns.append([_MISSING] * self.size)
+            self.pools.append({})
+            self.probes.append(0)
+        return i
+
+    def _intern(self, i: int, value):
+        """ Return the shared copy of a string value of column i
+        """
+        pool = self.pools[i]
+        if pool is None or type(value) is not str:
+            return value
+        value = pool.setdefault(value, value)
+        self.probes[i] += 1
+        if self.probes[i] == INTERN_PROBE and len(pool) * 2 > INTERN_PROBE:
+            self.pools[i] = None
+        return value
+
+    def put(self, row, record: dict) -> int:
+        """ Write a record to its row (a new one if row is None) and
+        return the row
+        """
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = self.size
+                self.size += 1
+                for column in self.columns:
+                    column.append(_MISSING)
+        else:
+            for column in self.columns:
+                column[row] = _MISSING
+        for field, value in record.items():
+            if field != 'id':
+                i = self._column(field)
+                self.columns[i][row] = self._intern(i, value)
+        return row
+
+    def delete(self, row: int):
+        """ Free a row
+        """
+        for column in self.columns:
+            column[row] = _MISSING
+        self.free.append(row)
+
+    def record(self, row: int, obj_id: str) -> dict:
+        """ Serialized object of a row
+        """
+        record = {'id': obj_id}
+        for field, i in self.fields.items():
+            value = self.columns[i][row]
+            if value is not _MISSING:
+                record[field] = value
+        return record
+
+    def value(self, row: int, field: str):
+        """ Serialized value of one field of a row, None if unset
+        """
+        i = self.fields.get(field)
+        if i is None:
+            return None
+        value = self.columns[i][row]
+        return None if value is _MISSING else value
+
+
+def _reset_table(cls):
+    """ Create an empty table for a COLUMNAR class, drop it otherwise
+    """
+    s_class = cls.__name__
+    with _live_lock:
+        if cls.COLUMNAR:
+            TABLES[s_class] = _Table()
+            LIVE[s_class] = weakref.WeakValueDictionary()
+        else:
+            TABLES.pop(s_class, None)
+            LIVE.pop(s_class, None)
+
+
+def _put(cls, obj_id: str, record: dict):
+    """ Store and index a serialized object (write lock held): as a row
+    of a COLUMNAR class, a raw record with LAZY_LOAD or else an object
+    """
+    s_class = cls.__name__
+    objects = DATA[s_class]
+    table = TABLES.get(s_class)
+    if table is not None:
+        stored = table.put(objects.get(obj_id), record)
+    elif cls.LAZY_LOAD:
+        stored = record
+    else:
+        stored = cls(**record)
+    objects[obj_id] = stored
+    _index(cls, obj_id, stored)
+
+
+def _drop(cls, obj_id: str) -> bool:
+    """ Remove an object from the store and the indexes (write lock
+    held); False if it was not stored
+    """
+    s_class = cls.__name__
+    stored = DATA[s_class].pop(obj_id, None)
+    if stored is None:
+        return False
+    _unindex(cls, obj_id)
+    table = TABLES.get(s_class)
+    if table is not None:
+        table.delete(stored)
+        with _live_lock:
+            LIVE[s_class].pop(obj_id, None)
+    return True
+
+
+def _encoded(obj) -> str:
+    """ JSON text of a stored object or raw record
+    """
+    if type(obj) is dict:
+        return json.dumps(obj)
+    return obj.to_json_text(True)
+
+
+def _attribute(s_class: str, obj, attr: str):
+    """ Value of an attribute on an object, raw record or table row
+    """
+    if type(obj) is int:
+        return TABLES[s_class].value(obj, attr)
+    if type(obj) is dict:
+        return obj.get(attr)
+    return getattr(obj, attr, None)
+
+
+def _index(cls, obj_id: str, obj):
+    """ Add (or move) an object or raw record in the indexes
+
+    A bucket holding a single ID stores the ID itself rather than a dict,
+    which is most of them for unique attributes such as email.
+    """
+    s_class = cls.__name__
+    _unindex(cls, obj_id)
+    values = []
+    for attr, index in INDEXES[s_class].items():
+        value = _attribute(s_class, obj, attr)
+        try:
+            bucket = index.get(value)
+        except TypeError:
+            values.append(_MISSING)
+            continue
+        if bucket is None:
+            index[value] = obj_id
+        elif type(bucket) is dict:
+            bucket[obj_id] = None
+        elif bucket != obj_id:
+            index[value] = {bucket: None, obj_id: None}
+        values.append(value)
+    INDEXED_VALUES[s_class][obj_id] = tuple(values)
+
+
+def _unindex(cls, obj_id: str):
+    """ Remove an object from the indexes
+    """
+    s_class = cls.__name__
+    values = INDEXED_VALUES[s_class].pop(obj_id, ())
+    for index, value in zip(INDEXES[s_class].values(), values):
+        if value is _MISSING:
+            continue
+        bucket = index[value]
+        if type(bucket) is not dict:
+            del index[value]
+            continue
+        del bucket[obj_id]
+        if len(bucket) == 1:
+            index[value] = next(iter(bucket))
+
+
+def _candidates(cls, attributes: dict) -> List[str]:
+    """ Narrow a search to the IDs of one index bucket when an indexed
+    attribute (or id) is queried, else all IDs
+    """
+    s_class = cls.__name__
+    objects = _objects(cls)
+    if 'id' in attributes:
+        return [attributes['id']] if attributes['id'] in objects else []
+    with _data_lock(s_class).read():
+        for attr, index in INDEXES[s_class].items():
+            if attr in attributes:
+                try:
+                    bucket = index.get(attributes[attr])
+                except TypeError:
+                    continue
+                if bucket is None:
+                    return []
+                if type(bucket) is dict:
+                    return list(bucket)
+                return [bucket]
+        return list(objects)
+
+
+def _hydrate(cls, ids: Iterable[str]) -> List[TypeVar('Base')]:
+    """ Return the objects of some IDs, building the ones still held as
+    raw records or table rows; IDs removed in the meantime are skipped
+    """
+    s_class = cls.__name__
+    objects = _objects(cls)
+    if s_class in TABLES:
+        return _hydrate_rows(cls, ids)
+    found = [(obj_id, objects.get(obj_id)) for obj_id in ids]
+    if any(type(obj) is dict for _, obj in found):
+        with _data_lock(s_class).write():
+            for i, (obj_id, obj) in enumerate(found):
+                obj = objects.get(obj_id)
+                if type(obj) is dict:
+                    obj = objects[obj_id] = cls(**obj)
+                found[i] = (obj_id, obj)
+    return [obj for _, obj in found if obj is not None]
+
+
+def _hydrate_rows(cls, ids: Iterable[str]) -> List[TypeVar('Base')]:
+    """ Return the objects of some IDs of a COLUMNAR class, reusing the
+    ones still referenced and building the others from their rows
+    """
+    s_class = cls.__name__
+    objects = DATA[s_class]
+    live = LIVE[s_class]
+    found = []
+    with _data_lock(s_class).read():
+        table = TABLES[s_class]
+        for obj_id in ids:
+            obj = live.get(obj_id)
+            if obj is None:
+                row = objects.get(obj_id)
+                if row is None:
+                    continue
+                obj = table.record(row, obj_id)
+            found.append(obj)
+    for i, obj in enumerate(found):
+        if type(obj) is dict:
+            with _live_lock:
+                found[i] = live.setdefault(obj['id'], cls(**obj))
+    return found
+
+
+def _snapshot_items(cls) -> Iterable[tuple]:
+    """ Yield the (ID, JSON text) of every stored object; rows of a
+    COLUMNAR class are read SNAPSHOT_CHUNK at a time under the read lock
+    """
+    s_class = cls.__name__
+    with _data_lock(s_class).read():
+        table = TABLES.get(s_class)
+        items = list(DATA[s_class].items())
+    if table is None:
+        for obj_id, obj in items:
+            yield obj_id, _encoded(obj)
+        return
+    objects = DATA[s_class]
+    for start in range(0, len(items), SNAPSHOT_CHUNK):
+        chunk = []
+        with _data_lock(s_class).read():
+            for obj_id, _ in items[start:start + SNAPSHOT_CHUNK]:
+                row = objects.get(obj_id)
+                if row is not None:
+                    chunk.append((obj_id, table.record(row, obj_id)))
+        for obj_id, record in chunk:
+            yield obj_id, json.dumps(record)
+
+
+def _write_snapshot(cls, file_path: str):
+    """ Stream the objects to a temporary file and move it over file_path
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=file_path + ".", suffix=".tmp",
+                                    dir=path.dirname(file_path) or ".")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("{")
+            separator = ""
+            for obj_id, text in _snapshot_items(cls):
+                f.write("{}{}: {}".format(separator, json.dumps(obj_id),
+                                          text))
+                separator = ", "
+            f.write("}")
+            f.flush()
+            os.fsync(f.fileno())
+        _rotate_snapshots(cls, file_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(file_path)
+
+
+def _rotate_snapshots(cls, file_path: str):
+    """ Keep the last SNAPSHOT_BACKUPS snapshots as file_path.1..N
+    """
+    if cls.SNAPSHOT_BACKUPS < 1 or not path.exists(file_path):
+        return
+    for i in range(cls.SNAPSHOT_BACKUPS - 1, 0, -1):
+        older = "{}.{}".format(file_path, i)
+        if path.exists(older):
+            os.replace(older, "{}.{}".format(file_path, i + 1))
+    backup = "{}.1".format(file_path)
+    if path.exists(backup):
+        os.remove(backup)
+    try:
+        os.link(file_path, backup)
+    except OSError:
+        shutil.copyfile(file_path, backup)
+
+
+def _fsync_dir(file_path: str):
+    """ Persist a rename by syncing the directory that holds file_path
+    """
+    try:
+        fd = os.open(path.dirname(file_path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _journal(s_class: str) -> dict:
+    """ Return the journal state of a class, creating it on first use
+    """
+    return JOURNALS.setdefault(s_class, {'file': None, 'unsynced': 0,
+                                         'entries': 0, 'compactor': None})
+
+
+def _append_journal(storage: FileStorage, cls, record: dict):
+    """ Append one upsert/delete record to the class journal
+    """
+    s_class = cls.__name__
+    journal = _journal(s_class)
+    if journal['file'] is None:
+        journal['file'] = open(".db_{}.journal".format(s_class), 'a')
+    f = journal['file']
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+    journal['unsynced'] += 1
+    journal['entries'] += 1
+    if (cls.JOURNAL_FSYNC_EVERY and
+            journal['unsynced'] >= cls.JOURNAL_FSYNC_EVERY):
+        os.fsync(f.fileno())
+        journal['unsynced'] = 0
+    if (cls.JOURNAL_COMPACT_EVERY and
+            journal['entries'] >= cls.JOURNAL_COMPACT_EVERY and
+            journal['compactor'] is None):
+        _rotate_journal(cls)
+
+
+def _rotate_journal(cls):
+    """ Move the journal aside and start folding it into the snapshot in
+    the background (I/O lock held)
+
+    A journal left aside by a compaction that failed is kept: the next
+    snapshot covers it as well.
+    """
+    s_class = cls.__name__
+    journal = _journal(s_class)
+    journal_path = ".db_{}.journal".format(s_class)
+    _close_journal_file(journal)
+    if (path.exists(journal_path) and
+            not path.exists(journal_path + ".old")):
+        os.replace(journal_path, journal_path + ".old")
+        _fsync_dir(journal_path)
+    journal['entries'] = 0
+    journal['compactor'] = threading.Thread(
+        target=_compact_journal, args=(cls,),
+        name="models-compact-{}".format(s_class), daemon=True)
+    journal['compactor'].start()
+
+
+def _compact_journal(cls):
+    """ Background compaction: write a snapshot that covers the journal
+    moved aside, then drop it
+    """
+    s_class = cls.__name__
+    old_path = ".db_{}.journal.old".format(s_class)
+    try:
+        with _snapshot_lock(s_class):
+            if path.exists(old_path):
+                _write_snapshot(cls, ".db_{}.json".format(s_class))
+                os.remove(old_path)
+    finally:
+        _journal(s_class)['compactor'] = None
+
+
+def _replay_journal(cls):
+    """ Apply the journals on top of the loaded snapshot, cutting off a
+    record torn by a crash
+
+    A journal moved aside for a compaction that did not finish is
+    replayed first. A last record that is complete but lost its trailing
+    newline gets the newline back, so the next append does not continue
+    its line.
+    """
+    s_class = cls.__name__
+    journal_path = ".db_{}.journal".format(s_class)
+    _close_journal(s_class)
+    entries = 0
+    for file_path in (journal_path + ".old", journal_path):
+        if not path.exists(file_path):
+            continue
+        with open(file_path, 'rb+') as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    f.truncate(offset)
+                    break
+                if not line.endswith(b"\n"):
+                    f.write(b"\n")
+                offset += len(line)
+                entries += 1
+                obj_id = record['id']
+                if record['op'] == 'delete':
+                    _drop(cls, obj_id)
+                else:
+                    _put(cls, obj_id, record['obj'])
+    _journal(s_class)['entries'] = entries
+
+
+def _close_journal(s_class: str):
+    """ Sync and close the journal of a class if it is open
+    """
+    journal = JOURNALS.get(s_class)
+    if journal is not None:
+        _close_journal_file(journal)
+
+
+def _truncate_journal(s_class: str):
+    """ Drop the journals once their records are in the snapshot
+    (snapshot lock held)
+    """
+    _close_journal(s_class)
+    journal_path = ".db_{}.journal".format(s_class)
+    for file_path in (journal_path, journal_path + ".old"):
+        if path.exists(file_path):
+            os.remove(file_path)
+    _journal(s_class)['entries'] = 0
+
+
+def _mark_dirty(storage: FileStorage, cls):
+    """ Record a pending write-behind flush for a class
+    """
+    global _writer
+    with _dirty_lock:
+        entry = DIRTY.get(cls.__name__)
+        if entry is None:
+            entry = DIRTY[cls.__name__] = {'storage': storage, 'cls': cls,
+                                           'count': 0,
+                                           'since': time.monotonic()}
+            _dirty_event.set()
+        entry['count'] += 1
+        if entry['count'] >= cls.WRITE_BEHIND_MAX_DIRTY:
+            _dirty_event.set()
+        if _writer is None:
+            _writer = threading.Thread(target=_write_behind_loop,
+                                       name="models-write-behind",
+                                       daemon=True)
+            _writer.start()
+
+
+def _flush_class(s_class: str):
+    """ Write one dirty class to its snapshot file
+    """
+    with _flush_lock:
+        with _dirty_lock:
+            entry = DIRTY.pop(s_class, None)
+        if entry is None:
+            return
+        try:
+            entry['storage'].save_all(entry['cls'])
+        except Exception:
+            with _dirty_lock:
+                DIRTY.setdefault(s_class, entry)
+            raise
+
+
+def _write_behind_loop():
+    """ Background writer: flush classes whose interval elapsed or whose
+    pending writes reached the threshold
+    """
+    while True:
+        with _dirty_lock:
+            now = time.monotonic()
+            due = []
+            timeout = None
+            for s_class, entry in DIRTY.items():
+                cls = entry['cls']
+                left = entry['since'] + cls.WRITE_BEHIND_INTERVAL - now
+                if left <= 0 or entry['count'] >= cls.WRITE_BEHIND_MAX_DIRTY:
+                    due.append(s_class)
+                elif timeout is None or left < timeout:
+                    timeout = left
+            _dirty_event.clear()
+        for s_class in due:
+            try:
+                _flush_class(s_class)
+            except Exception:
+                timeout = 1.0
+        _dirty_event.wait(timeout)
+
+
+@atexit.register
+def flush():
+    """ Write every class with pending write-behind changes now
+    """
+    with _dirty_lock:
+        pending = list(DIRTY)
+    for s_class in pending:
+        _flush_class(s_class)
+
+
+def _close_journal_file(journal: dict):
+    """ Sync and close a journal file if it is open
+    """
+    if journal['file'] is not None:
+        journal['file'].flush()
+        os.fsync(journal['file'].fileno())
+        journal['file'].close()
+        journal['file'] = None
+        journal['unsynced'] = 0
+
+
+@atexit.register
+def _close_journals():
+    """ Finish running compactions, then sync and close every open
+    journal at interpreter exit
+    """
+    for journal in list(JOURNALS.values()):
+        compactor = journal['compactor']
+        if compactor is not None:
+            compactor.join()
+        _close_journal_file(journal)
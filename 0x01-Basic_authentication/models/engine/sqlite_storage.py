@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+""" SQLite storage engine module
+
+Each model class gets a table holding the JSON document of every object,
+keyed by id, plus one indexed column per attribute listed in INDEXES.
+Several processes can share one database file; nothing is held in RAM.
+"""
+from typing import TypeVar, List
+from models.engine.storage import Storage, matches
+import json
+import sqlite3
+import threading
+
+
+def _quote(name: str) -> str:
+    """ Quote an SQL identifier
+    """
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _column_value(value):
+    """ Value stored in an index column; other types are not indexed
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return None
+
+
+class SQLiteStorage(Storage):
+    """ SQLite storage engine
+    """
+
+    def __init__(self, db_path: str):
+        """ Initialize the engine for one database file
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._tables = set()
+        self._tables_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """ Return the connection of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _table(self, cls) -> str:
+        """ Create the table and index columns of a class once and
+        return its quoted name
+        """
+        s_class = cls.__name__
+        table = _quote(s_class)
+        if s_class in self._tables:
+            return table
+        with self._tables_lock:
+            connection = self._connection()
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, "
+                "_document TEXT NOT NULL)".format(table))
+            columns = {row[1] for row in connection.execute(
+                "PRAGMA table_info({})".format(table))}
+            for attr in cls.INDEXES:
+                if attr not in columns:
+                    connection.execute("ALTER TABLE {} ADD COLUMN {}".format(
+                        table, _quote(attr)))
+                    connection.execute(
+                        "UPDATE {} SET {} = json_extract(_document, ?)"
+                        .format(table, _quote(attr)), ('$.' + _quote(attr),))
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                        _quote("idx_{}_{}".format(s_class, attr)), table,
+                        _quote(attr)))
+            self._tables.add(s_class)
+        return table
+
+    def _build(self, cls, rows) -> List[TypeVar('Base')]:
+        """ Build objects from (_document,) rows
+        """
+        return [cls(**json.loads(document)) for (document,) in rows]
+
+    def load(self, cls) -> None:
+        """ Make sure the table of a class exists
+        """
+        self._table(cls)
+
+    def save_all(self, cls) -> None:
+        """ Nothing to do: every save is already committed
+        """
+        self._table(cls)
+
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Insert or update one row
+        """
+        cls = obj.__class__
+        table = self._table(cls)
+        columns = ["id", "_document"] + [_quote(a) for a in cls.INDEXES]
+        values = [obj.id, obj.to_json_text(True)] + [
+            _column_value(getattr(obj, a, None)) for a in cls.INDEXES]
+        updates = ", ".join("{0} = excluded.{0}".format(c)
+                            for c in columns[1:])
+        self._connection().execute(
+            "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT(id) DO UPDATE "
+            "SET {}".format(table, ", ".join(columns),
+                            ", ".join("?" * len(columns)), updates),
+            values)
+
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Delete one row
+        """
+        table = self._table(obj.__class__)
+        self._connection().execute(
+            "DELETE FROM {} WHERE id = ?".format(table), (obj.id,))
+
+    def count(self, cls) -> int:
+        """ Count the rows of a class
+        """
+        table = self._table(cls)
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM {}".format(table)).fetchone()[0]
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        table = self._table(cls)
+        objs = self._build(cls, self._connection().execute(
+            "SELECT _document FROM {} WHERE id = ?".format(table), (id,)))
+        return objs[0] if objs else None
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search with the id and indexed attributes in SQL, then match
+        every attribute on the objects
+        """
+        table = self._table(cls)
+        where = []
+        params = []
+        for attr in ('id',) + tuple(cls.INDEXES):
+            if attr not in attributes:
+                continue
+            value = attributes[attr]
+            if value is None:
+                where.append("{} IS NULL".format(_quote(attr)))
+            elif _column_value(value) is not None:
+                where.append("{} = ?".format(_quote(attr)))
+                params.append(value)
+        sql = "SELECT _document FROM {}".format(table)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rowid"
+        objs = self._build(cls, self._connection().execute(sql, params))
+        return [obj for obj in objs if matches(obj, attributes)]
@@ -8,7 +8,7 @@ from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 
 from api.v1.views import app_views
-from api.v1.auth.auth import Auth
+from api.v1.auth.auth import Auth, PathMatcher
 from api.v1.auth.basic_auth import BasicAuth
 from api.v1.auth.session_auth import SessionAuth
 from api.v1.auth.session_exp_auth import SessionExpAuth
@@ -33,6 +33,14 @@ elif auth_type == "session_exp_auth":
 elif auth_type == "session_db_auth":
     auth = SessionDBAuth()
 
+excluded_paths = PathMatcher([
+        '/api/v1/status/',
+        '/api/v1/unauthorized/',
+        '/api/v1/forbidden/',
+        '/api/v1/auth_session/login/',
+        '/api/v1/auth_session/login'
+])
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -65,13 +73,6 @@ def before_request_func():
     if auth is None:
         return
 
-    excluded_paths = [
-            '/api/v1/status/',
-            '/api/v1/unauthorized/',
-            '/api/v1/forbidden/',
-            '/api/v1/auth_session/login/',
-            '/api/v1/auth_session/login'
-    ]
     if not auth.require_auth(request.path, excluded_paths):
         return
 
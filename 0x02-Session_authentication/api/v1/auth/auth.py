@@ -2,41 +2,106 @@
 """
 This module defines the base class for handling API authentication.
 """
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import Iterable, List, TypeVar, Union
 from flask import request
 from os import getenv
 
 
+PATH_CACHE_SIZE = 1024
+PATH_MATCHER_CACHE_SIZE = 16
+_END = None
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled once: exact paths in a set and wildcard
+    prefixes in a character trie, so a lookup walks the path once.
+    Decisions are cached per path.
+    """
+
+    def __init__(self, excluded_paths: Iterable[str],
+                 cache_size: int = PATH_CACHE_SIZE):
+        """
+        Compiles the excluded paths
+
+        Args:
+            excluded_paths (iterable): Paths, a trailing * matches any
+                path starting with the rest
+            cache_size (int): Decisions kept by the per-path cache
+        """
+        self.paths = tuple(excluded_paths)
+        self.exact = set()
+        self.prefixes = {}
+        for excluded_path in self.paths:
+            if excluded_path.endswith('*'):
+                node = self.prefixes
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                node[_END] = True
+            else:
+                if not excluded_path.endswith('/'):
+                    excluded_path += '/'
+                self.exact.add(excluded_path)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of excluded paths
+        """
+        return len(self.paths)
+
+    def _match(self, path: str) -> bool:
+        """
+        Tells if a path is excluded (uncached)
+        """
+        if not path.endswith('/'):
+            path += '/'
+        if path in self.exact:
+            return True
+        node = self.prefixes
+        if _END in node:
+            return True
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+
+@lru_cache(maxsize=PATH_MATCHER_CACHE_SIZE)
+def get_path_matcher(excluded_paths: tuple) -> PathMatcher:
+    """
+    Returns the shared PathMatcher of a tuple of excluded paths
+    """
+    return PathMatcher(excluded_paths)
+
+
 class Auth:
     """
     Auth class to manage API authentication
     """
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """
         Determines if authentication is required for the given path
 
         Returns True if the path is not in excluded_paths
         Supports wildcard * at the end of excluded_paths
+        excluded_paths is best passed as a PathMatcher built once; a list
+        is compiled on first use and the matcher reused
         """
         if path is None:
             return True
         if excluded_paths is None or not excluded_paths:
             return True
 
-        if not path.endswith('/'):
-            path += '/'
-
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith('*'):
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            else:
-                if not excluded_path.endswith('/'):
-                    excluded_path += '/'
-                if path == excluded_path:
-                    return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = get_path_matcher(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -3,6 +3,7 @@
 SessionAuth module for session authentication
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import SessionStore
 import uuid
 from models.user import User
 
@@ -10,8 +11,11 @@ from models.user import User
 class SessionAuth(Auth):
     """"
     Session authentication logic.
+
+    Sessions live in a bounded, sharded SessionStore shared by every
+    instance (see SessionStore.from_env for its settings).
     """
-    user_id_by_session_id = {}
+    user_id_by_session_id = SessionStore.from_env()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -59,5 +63,5 @@ class SessionAuth(Auth):
         if self.user_id_for_session_id(session_id) is None:
             return False
 
-        del self.user_id_by_session_id[session_id]
+        self.user_id_by_session_id.pop(session_id, None)
         return True
@@ -2,7 +2,6 @@
 """
 Session-based authentication with DB persistence
 """
-from datetime import datetime
 from models.user_session import UserSession
 from api.v1.auth.session_exp_auth import SessionExpAuth
 
@@ -21,15 +20,17 @@ class SessionDBAuth(SessionExpAuth):
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
-        """Retrieves a user ID by session_id from the DB"""
+        """Retrieves a user ID by session_id from the DB (indexed)"""
         if session_id is None:
             return None
 
-        user_sessions = storage.all(UserSession).values()
-        for session in user_sessions:
-            if session.session_id == session_id:
-                return session.user_id
-        return None
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
+            return None
+        session = user_sessions[0]
+        if self.expired(session.created_at):
+            return None
+        return session.user_id
 
     def destroy_session(self, request=None):
         """Deletes the session from storage"""
@@ -40,10 +41,10 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return False
 
-        user_sessions = storage.all(UserSession).values()
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
+            return False
         for session in user_sessions:
-            if session.session_id == session_id:
-                storage.delete(session)
-                storage.save()
-                return True
-        return False
+            session.remove()
+        self.user_id_by_session_id.pop(session_id, None)
+        return True
@@ -24,32 +24,29 @@ class SessionExpAuth(SessionAuth):
         session_id = super().create_session(user_id)
         if session_id is None:
             return None
-        self.user_id_by_session_id[session_id] = {
+        self.user_id_by_session_id.put(session_id, {
             'user_id': user_id,
             'created_at': datetime.now()
-        }
+        }, ttl=self.session_duration)
         return session_id
 
+    def expired(self, created_at: datetime) -> bool:
+        """Tell if a session created at created_at has expired"""
+        if self.session_duration <= 0:
+            return False
+        if created_at is None:
+            return True
+        expire_at = created_at + timedelta(seconds=self.session_duration)
+        return expire_at < datetime.now()
+
     def user_id_for_session_id(self, session_id=None):
         """Retrieve user ID from session ID with expiration check"""
         if session_id is None:
             return None
 
-        user_sessions = storage.all(UserSession).values()
-        for session in user_sessions:
-            if session.session_id == session_id:
-                if self.session_duration <= 0:
-                    return session.user_id
-
-                if not hasattr(session, "created_at"):
-                    return None
-
-                expire_at = (
-                        session.created_at +
-                        timedelta(seconds=self.session_duration)
-                )
-                if expire_at < datetime.now():
-                    return None
-
-                return session.user_id
-        return None
+        session = self.user_id_by_session_id.get(session_id)
+        if not isinstance(session, dict):
+            return None
+        if self.expired(session.get('created_at')):
+            return None
+        return session.get('user_id')
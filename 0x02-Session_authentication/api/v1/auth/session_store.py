@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+SessionStore module: bounded in-memory session storage
+"""
+from collections import OrderedDict
+from os import getenv
+from typing import Any, Dict
+import heapq
+import threading
+import time
+
+
+_MISSING = object()
+
+
+class SessionStore:
+    """
+    Dict-like session storage split in lock-striped shards
+
+    Each shard keeps at most max_size / shards sessions and evicts the
+    least recently used one past that. Sessions stored with a TTL expire:
+    a background sweeper sleeps until the earliest deadline of a heap
+    (plus resolution seconds, so deadlines close together are swept in
+    one pass) and drops them; lookups ignore expired sessions not yet
+    swept.
+    """
+
+    def __init__(self, shards: int = 16, max_size: int = 0,
+                 ttl: float = 0, resolution: float = 1.0):
+        """
+        Initialize an empty store
+
+        Args:
+            shards (int): Number of independently locked shards
+            max_size (int): Maximum number of sessions (0: unbounded)
+            ttl (float): Default seconds before a session expires
+                (0: never)
+            resolution (float): Seconds the sweeper waits past a
+                deadline to batch the next ones
+        """
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.resolution = resolution
+        self._shard_size = -(-max_size // shards) if max_size > 0 else 0
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._evictions = [0] * shards
+        self._expired = [0] * shards
+        self._heap = []
+        self._heap_cond = threading.Condition(threading.Lock())
+        self._sweeper = None
+        self.sweeps = 0
+
+    @classmethod
+    def from_env(cls) -> 'SessionStore':
+        """
+        Build a store sized by SESSION_STORE_SHARDS (default 16) and
+        SESSION_STORE_MAX_SIZE (default 100000, 0: unbounded)
+        """
+        try:
+            shards = int(getenv('SESSION_STORE_SHARDS', '16'))
+        except ValueError:
+            shards = 16
+        try:
+            max_size = int(getenv('SESSION_STORE_MAX_SIZE', '100000'))
+        except ValueError:
+            max_size = 100000
+        return cls(max(shards, 1), max_size)
+
+    def _shard(self, session_id: str) -> int:
+        """
+        Index of the shard holding a session
+        """
+        return hash(session_id) % len(self._shards)
+
+    def put(self, session_id: str, value: Any, ttl: float = None) -> None:
+        """
+        Store a session, expiring after ttl seconds (default self.ttl)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+        i = self._shard(session_id)
+        shard = self._shards[i]
+        with self._locks[i]:
+            shard[session_id] = (value, expires_at)
+            shard.move_to_end(session_id)
+            while self._shard_size and len(shard) > self._shard_size:
+                shard.popitem(last=False)
+                self._evictions[i] += 1
+        if expires_at is not None:
+            self._schedule(expires_at, session_id)
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        """
+        Return the value of a live session, or default
+        """
+        i = self._shard(session_id)
+        shard = self._shards[i]
+        with self._locks[i]:
+            entry = shard.get(session_id)
+            if entry is None:
+                return default
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del shard[session_id]
+                self._expired[i] += 1
+                return default
+            shard.move_to_end(session_id)
+            return entry[0]
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        """
+        Remove a session and return its value, or default
+        """
+        i = self._shard(session_id)
+        with self._locks[i]:
+            entry = self._shards[i].pop(session_id, None)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def __setitem__(self, session_id: str, value: Any) -> None:
+        """
+        Store a session with the default TTL
+        """
+        self.put(session_id, value)
+
+    def __getitem__(self, session_id: str) -> Any:
+        """
+        Return the value of a live session or raise KeyError
+        """
+        value = self.get(session_id, _MISSING)
+        if value is _MISSING:
+            raise KeyError(session_id)
+        return value
+
+    def __delitem__(self, session_id: str) -> None:
+        """
+        Remove a session or raise KeyError
+        """
+        if self.pop(session_id, _MISSING) is _MISSING:
+            raise KeyError(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        """
+        Tell if a session is live
+        """
+        return self.get(session_id, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        """
+        Number of stored sessions (expired ones not yet swept included)
+        """
+        return sum(len(shard) for shard in self._shards)
+
+    def clear(self) -> None:
+        """
+        Remove every session
+        """
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                shard.clear()
+        with self._heap_cond:
+            self._heap.clear()
+
+    def _schedule(self, expires_at: float, session_id: str) -> None:
+        """
+        Queue a session for the sweeper, starting it on first use
+        """
+        with self._heap_cond:
+            heapq.heappush(self._heap, (expires_at, session_id))
+            if len(self._heap) > 2 * len(self) + 1024:
+                self._compact_heap()
+            if self._heap[0][1] == session_id:
+                self._heap_cond.notify()
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(
+                    target=self._sweep_loop, name="session-sweeper",
+                    daemon=True)
+                self._sweeper.start()
+
+    def _compact_heap(self) -> None:
+        """
+        Rebuild the heap from the live sessions, dropping the deadlines
+        of sessions removed or replaced since (heap lock held)
+        """
+        heap = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                heap.extend((entry[1], session_id)
+                            for session_id, entry in shard.items()
+                            if entry[1] is not None)
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def sweep(self) -> int:
+        """
+        Remove every session past its deadline; return how many
+        """
+        now = time.monotonic()
+        due = []
+        with self._heap_cond:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+            self.sweeps += 1
+        removed = 0
+        for expires_at, session_id in due:
+            i = self._shard(session_id)
+            shard = self._shards[i]
+            with self._locks[i]:
+                entry = shard.get(session_id)
+                if entry is not None and entry[1] == expires_at:
+                    del shard[session_id]
+                    self._expired[i] += 1
+                    removed += 1
+        return removed
+
+    def _sweep_loop(self) -> None:
+        """
+        Background sweeper: wait for the earliest deadline, then sweep
+        """
+        while True:
+            with self._heap_cond:
+                while not self._heap:
+                    self._heap_cond.wait()
+                timeout = (self._heap[0][0] + self.resolution -
+                           time.monotonic())
+                if timeout > 0:
+                    self._heap_cond.wait(timeout)
+                    continue
+            self.sweep()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Return the live sessions and the eviction/expiry/sweep counters
+        """
+        return {'live': len(self), 'evictions': sum(self._evictions),
+                'expired': sum(self._expired), 'sweeps': self.sweeps,
+                'shards': len(self._shards), 'max_size': self.max_size}
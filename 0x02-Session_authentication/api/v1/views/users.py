@@ -2,8 +2,34 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import abort, current_app, jsonify, request
+from flask import json as flask_json
 from models.user import User
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = None
+
+
+def jsonify_is_compact() -> bool:
+    """ Tells if jsonify renders like User.to_json_text: compact,
+    ASCII-only and with sorted keys, under the app's JSON settings
+    """
+    app = current_app
+    if DefaultJSONProvider is not None:
+        provider = app.json
+        if type(provider) is not DefaultJSONProvider:
+            return False
+        compact = provider.compact
+        if compact is None:
+            compact = not app.debug
+        return bool(compact and provider.sort_keys and
+                    provider.ensure_ascii)
+    if app.config.get("JSONIFY_PRETTYPRINT_REGULAR") or app.debug:
+        return False
+    return bool(app.config.get("JSON_SORT_KEYS", True) and
+                app.config.get("JSON_AS_ASCII", True) and
+                app.json_encoder is flask_json.JSONEncoder)
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
@@ -12,8 +38,11 @@ def view_all_users() -> str:
     Return:
       - list of all User objects JSON represented
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    if not jsonify_is_compact():
+        return jsonify([user.to_json() for user in User.all()])
+    all_users = ",".join(user.to_json_text() for user in User.all())
+    return current_app.response_class("[{}]\n".format(all_users),
+                                      mimetype="application/json")
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the models storage and the authentication helpers
+"""
+import base64
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from models.base import (DATA, TIMESTAMP_FORMAT, format_timestamp,
+                         parse_timestamp)
+from models.user import User
+from models.user_session import UserSession
+from api.v1.auth.basic_auth import MAX_AUTHORIZATION_HEADER_LENGTH, BasicAuth
+from api.v1.auth.session_db_auth import SessionDBAuth
+
+
+COUNT = 100000
+
+
+def make_users(count: int) -> None:
+    """
+    Writes count users to the User snapshot of the current directory
+    """
+    User.COLUMNAR = False
+    User.LAZY_LOAD = False
+    User.load_from_file()
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First{}".format(i),
+                    last_name="Last{}".format(i))
+        user.password = "password{}".format(i)
+        DATA['User'][user.id] = user
+    User.save_to_file()
+
+
+def bench_memory(count: int = COUNT) -> None:
+    """
+    Reports the bytes held per user by each in-memory layout, objects
+    and columnar, and checks that to_json is the same in both
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            make_users(count)
+            expected = None
+            for layout in ("objects", "columnar"):
+                User.COLUMNAR = layout == "columnar"
+                DATA['User'].clear()
+                tracemalloc.start()
+                User.load_from_file()
+                size = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                print("{:<8} {:>6.0f} bytes/user".format(
+                    layout, size / count))
+                users = sorted((user.to_json() for user in User.all()),
+                               key=lambda user: user['id'])
+                assert expected is None or users == expected
+                expected = users
+        finally:
+            User.COLUMNAR = False
+            DATA['User'].clear()
+            User.load_from_file()
+            os.chdir(cwd)
+
+
+def timed(label: str, fn, count: int) -> None:
+    """
+    Runs fn once and prints its cost per record
+    """
+    start = time.perf_counter()
+    fn()
+    print("{:<28} {:>8.3f} us/record".format(
+        label, (time.perf_counter() - start) / count * 1e6))
+
+
+def bench_timestamps(count: int = COUNT) -> None:
+    """
+    Compares strptime/strftime with the fast timestamp paths, alone and
+    when loading and serializing users
+    """
+    start = datetime(2020, 1, 1)
+    stamps = [start + timedelta(seconds=i * 37) for i in range(count)]
+    texts = [stamp.strftime(TIMESTAMP_FORMAT) for stamp in stamps]
+    timed("strptime", lambda: [
+        datetime.strptime(text, TIMESTAMP_FORMAT) for text in texts], count)
+    timed("parse_timestamp", lambda: [
+        parse_timestamp(text) for text in texts], count)
+    timed("strftime", lambda: [
+        stamp.strftime(TIMESTAMP_FORMAT) for stamp in stamps], count)
+    timed("format_timestamp", lambda: [
+        format_timestamp(stamp) for stamp in stamps], count)
+    records = [User(email="user{}@example.com".format(i), created_at=text,
+                    updated_at=text).to_json(True)
+               for i, text in enumerate(texts)]
+    users = []
+
+    def load():
+        """
+        Builds the users and reads a timestamp of each
+        """
+        for record in records:
+            user = User(**record)
+            user.updated_at
+            users.append(user)
+
+    timed("load + read timestamps", load, count)
+    timed("to_json (first)", lambda: [user.to_json() for user in users],
+          count)
+    for user in users:
+        user.updated_at = datetime.utcnow()
+    timed("to_json (after update)", lambda: [
+        user.to_json() for user in users], count)
+    timed("to_json (cached)", lambda: [user.to_json() for user in users],
+          count)
+
+
+def bench_list_serialization(count: int = COUNT) -> None:
+    """
+    Compares encoding the user list in one json.dumps call with joining
+    the cached per-user fragments
+    """
+    users = [User(email="user{}@example.com".format(i), first_name="First",
+                  last_name="Last") for i in range(count)]
+    timed("json.dumps(to_json list)", lambda: json.dumps(
+        [user.to_json() for user in users], sort_keys=True,
+        separators=(',', ':')), count)
+    timed("join to_json_text (first)", lambda: ",".join(
+        user.to_json_text() for user in users), count)
+    timed("join to_json_text (cached)", lambda: ",".join(
+        user.to_json_text() for user in users), count)
+
+
+def bench_basic_header(number: int = COUNT) -> None:
+    """
+    Compares the step-by-step Basic header parsing with the fused fast
+    path on valid, malformed and oversized headers
+    """
+    auth = BasicAuth()
+
+    def steps(header: str):
+        """
+        The extract/decode/extract pipeline
+        """
+        encoded = auth.extract_base64_authorization_header(header)
+        decoded = auth.decode_base64_authorization_header(encoded)
+        return auth.extract_user_credentials(decoded)
+
+    headers = {
+        "valid": "Basic " + base64.b64encode(
+            b"bob@hbtn.io:H0lbertonSchool98!").decode(),
+        "malformed": "Basic Ym9iQGhidG4uaW8$SDBsYmVydG9uU2Nob29sOTgh",
+        "oversized": "Basic " + "A" * (MAX_AUTHORIZATION_HEADER_LENGTH * 4),
+    }
+    for label, header in headers.items():
+        for name, parse in (("steps", steps),
+                            ("fast path", auth.parse_authorization_header)):
+            seconds = timeit.timeit(lambda: parse(header), number=number)
+            print("{:<24} {:>8.3f} us/header".format(
+                "{} ({})".format(name, label), seconds / number * 1e6))
+
+
+def bench_sessions(count: int = 1000000, lookups: int = 1000) -> None:
+    """
+    Times SessionDBAuth lookups and logouts against count persisted
+    sessions, next to a linear scan of the stored records
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            created_at = datetime.now().strftime(TIMESTAMP_FORMAT)
+            session_ids = []
+            with open(".db_UserSession.json", "w") as f:
+                f.write("{")
+                for i in range(count):
+                    session_id = str(uuid.uuid4())
+                    session_ids.append(session_id)
+                    record = {'id': str(uuid.uuid4()),
+                              'created_at': created_at,
+                              'updated_at': created_at,
+                              'user_id': "user{}".format(i % 1000),
+                              'session_id': session_id}
+                    f.write("{}{}: {}".format("," if i else "",
+                                              json.dumps(record['id']),
+                                              json.dumps(record)))
+                f.write("}")
+            start = time.perf_counter()
+            UserSession.load_from_file()
+            print("load {} sessions: {:.2f} s".format(
+                count, time.perf_counter() - start))
+            auth = SessionDBAuth()
+            sample = random.sample(session_ids, lookups)
+
+            def scan(session_id: str) -> str:
+                """
+                The former linear scan, over the raw records
+                """
+                for record in DATA['UserSession'].values():
+                    if record['session_id'] == session_id:
+                        return record['user_id']
+                return None
+
+            timed("linear scan", lambda: [
+                scan(session_id) for session_id in sample[:10]], 10)
+            for label in ("indexed lookup (cold)", "indexed lookup (warm)"):
+                timed(label, lambda: [
+                    auth.user_id_for_session_id(session_id)
+                    for session_id in sample], lookups)
+
+            class Request:
+                """
+                Just enough of a request for destroy_session
+                """
+                cookies = {}
+
+            session_name = os.environ.get("SESSION_NAME")
+            os.environ["SESSION_NAME"] = "session_id"
+
+            def logout():
+                """
+                Destroys the sampled sessions
+                """
+                for session_id in sample:
+                    Request.cookies = {"session_id": session_id}
+                    assert auth.destroy_session(Request())
+
+            try:
+                timed("indexed logout", logout, lookups)
+            finally:
+                if session_name is None:
+                    del os.environ["SESSION_NAME"]
+                else:
+                    os.environ["SESSION_NAME"] = session_name
+        finally:
+            os.chdir(cwd)
+            UserSession.load_from_file()
+
+
+if __name__ == "__main__":
+    bench_memory()
+    bench_timestamps()
+    bench_list_serialization()
+    bench_basic_header()
+    bench_sessions()
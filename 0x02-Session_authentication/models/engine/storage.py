@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+""" Storage engine interface module
+"""
+from abc import ABC, abstractmethod
+from typing import TypeVar, List
+
+
+def matches(obj: TypeVar('Base'), attributes: dict) -> bool:
+    """ Tell if an object has all the attribute values of a search
+    """
+    for k, v in attributes.items():
+        if (getattr(obj, k) != v):
+            return False
+    return True
+
+
+class Storage(ABC):
+    """ Storage engine interface used by models.base.Base
+
+    Every method receives the model class (or an instance of it), so one
+    engine serves all models. Every method but flush is abstract, so an
+    engine missing one cannot be instantiated.
+    """
+
+    @abstractmethod
+    def load(self, cls) -> None:
+        """ Prepare the store of a class (read it from disk if needed)
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def save_all(self, cls) -> None:
+        """ Persist every object of a class
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def save(self, obj: TypeVar('Base')) -> None:
+        """ Insert or update one object
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def remove(self, obj: TypeVar('Base')) -> None:
+        """ Delete one object
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def count(self, cls) -> int:
+        """ Count the objects of a class
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return the objects of a class with matching attributes
+        """
+        raise NotImplementedError()
+
+    def flush(self) -> None:
+        """ Write out anything the engine buffers
+        """
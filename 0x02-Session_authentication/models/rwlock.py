@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+""" Reader/writer lock module
+"""
+from contextlib import contextmanager
+from typing import Iterator
+import threading
+
+
+class ReadWriteLock():
+    """ Lock shared by many readers or held by one writer
+
+    Waiting writers block new readers so writes are not starved.
+    The lock is not reentrant.
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked ReadWriteLock
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """ Hold the lock shared for the duration of the block
+        """
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """ Hold the lock exclusively for the duration of the block
+        """
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -13,7 +13,19 @@ class UserSession(Base):
         user_id: string - the ID of the user
         session_id: string - the ID of the session
         created_at: datetime - when the session was created
+
+    Sessions are looked up by session_id through a secondary index, kept
+    as raw records until used, and written to a journal so a login or
+    logout appends one record instead of rewriting every session. Every
+    JOURNAL_COMPACT_EVERY records the journal is moved aside and folded
+    into the snapshot by a background thread, so no login waits on it.
     """
+
+    INDEXES = ('session_id',)
+    PERSISTENCE = "journal"
+    JOURNAL_COMPACT_EVERY = 10000
+    LAZY_LOAD = True
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initializes a UserSession instance"""
         super().__init__(*args, **kwargs)
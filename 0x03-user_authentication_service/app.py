@@ -7,11 +7,20 @@ Defines endpoints to serve a welcome message and handle user registration.
 
 from flask import Flask, jsonify, request, abort, redirect
 from auth import Auth
+from hashing_service import HashingServiceBusy
 
 app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.errorhandler(HashingServiceBusy)
+def hashing_busy(error) -> str:
+    """
+    Password hashing is saturated: ask the client to retry later
+    """
+    return jsonify({"message": "service busy"}), 503
+
+
 @app.route("/", methods=["GET"])
 def index() -> str:
     """
@@ -3,10 +3,9 @@
 Auth module for handling user registration and authentication.
 """
 
-import bcrypt
-
 from uuid import uuid4
 from db import DB
+from hashing_service import get_hashing_service
 from user import User
 from sqlalchemy.orm.exc import NoResultFound
 from typing import Optional
@@ -14,7 +13,8 @@ from typing import Optional
 
 def _hash_password(password: str) -> bytes:
     """
-    Hashes a password using bcrypt with a randomly-generated salt.
+    Hashes a password using bcrypt with a randomly-generated salt,
+    in the shared hashing service's worker processes.
 
     Args:
         password (str): The password to hash.
@@ -22,7 +22,7 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: The salted hashed password.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return get_hashing_service().hash_password(password)
 
 
 def _generate_uuid() -> str:
@@ -77,12 +77,14 @@ class Auth:
         Returns:
             bool: True if credentials are valid, False otherwise.
         """
+        if not isinstance(password, str):
+            return False
         try:
             user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(password.encode('utf-8'),
-                                  user.hashed_password.encode('utf-8'))
         except Exception:
             return False
+        return get_hashing_service().check_password(
+            password, user.hashed_password.encode('utf-8'))
 
     def create_session(self, email: str) -> Optional[str]:
         """
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Module for running bcrypt hashing and verification off the caller's
+thread, in a pool of worker processes.
+"""
+import asyncio
+import os
+import threading
+import bcrypt
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+
+PENDING_PER_WORKER = 8
+_service = None
+_service_lock = threading.Lock()
+
+
+class HashingServiceBusy(RuntimeError):
+    """
+    Raised when the hashing service already has max_pending jobs queued
+    """
+
+
+def _hash(password: bytes, rounds: Optional[int]) -> bytes:
+    """
+    Worker: hashes a password with a fresh salt.
+    """
+    salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
+    return bcrypt.hashpw(password, salt)
+
+
+def _check(password: bytes, hashed_password: bytes) -> bool:
+    """
+    Worker: checks a password against a hash; malformed hashes fail.
+    """
+    try:
+        return bcrypt.checkpw(password, hashed_password)
+    except ValueError:
+        return False
+
+
+class HashingService:
+    """
+    Process pool for CPU-bound bcrypt work with a bounded queue
+
+    Each method has a blocking form and an awaitable `_async` form.
+    Submitting while max_pending jobs are in flight raises
+    HashingServiceBusy instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        """
+        Initialize the pool
+
+        Args:
+            workers (int): Worker processes, defaults to the CPU count.
+            max_pending (int): Jobs queued or running before rejecting.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * PENDING_PER_WORKER
+        self._executor = ProcessPoolExecutor(self.workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _submit(self, fn, *args) -> Future:
+        """
+        Submits a job if a queue slot is free
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingServiceBusy("Hashing service is saturated")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash_password(self, password: str, rounds: int = None) -> bytes:
+        """
+        Hashes a password in a worker process and waits for the result.
+        """
+        return self._submit(_hash, password.encode('utf-8'), rounds).result()
+
+    def check_password(self, password: str, hashed_password: bytes) -> bool:
+        """
+        Checks a password in a worker process and waits for the result.
+        """
+        return self._submit(_check, password.encode('utf-8'),
+                            hashed_password).result()
+
+    async def hash_password_async(self, password: str,
+                                  rounds: int = None) -> bytes:
+        """
+        Awaitable form of hash_password.
+        """
+        return await asyncio.wrap_future(
+            self._submit(_hash, password.encode('utf-8'), rounds))
+
+    async def check_password_async(self, password: str,
+                                   hashed_password: bytes) -> bool:
+        """
+        Awaitable form of check_password.
+        """
+        return await asyncio.wrap_future(
+            self._submit(_check, password.encode('utf-8'), hashed_password))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker processes.
+        """
+        self._executor.shutdown(wait)
+
+
+def get_hashing_service() -> HashingService:
+    """
+    Returns the process-wide hashing service, sized by HASHING_WORKERS
+    and HASHING_MAX_PENDING when set.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HashingService(
+                int(os.getenv("HASHING_WORKERS", "0")) or None,
+                int(os.getenv("HASHING_MAX_PENDING", "0")) or None)
+        return _service